@@ -0,0 +1,32 @@
+"""
+Access control of the manifest administration endpoints.
+
+POST /manifest/update, POST /manifest/rollback and DELETE /manifest/blocked
+need the MANIFEST_ADMIN_TOKEN sent in the X-Admin-Token header. It is its
+own secret, separate from the profiling one. The start scripts generate one
+into .env when it is missing. Without a token, these endpoints are refused;
+the weekly update still runs.
+"""
+import hmac
+import logging
+import os
+
+from dotenv import load_dotenv
+from fastapi import Request
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_ADMIN_TOKEN = os.getenv("MANIFEST_ADMIN_TOKEN", "")
+
+if not MANIFEST_ADMIN_TOKEN:
+    logger.warning("MANIFEST_ADMIN_TOKEN is not set: manifest administration endpoints are disabled")
+
+
+def is_manifest_admin(request: Request) -> bool:
+    """True when a manifest admin token is configured and the request carries it."""
+    if not MANIFEST_ADMIN_TOKEN:
+        return False
+    token = request.headers.get("x-admin-token", "")
+    return hmac.compare_digest(token.encode('utf-8'), MANIFEST_ADMIN_TOKEN.encode('utf-8'))
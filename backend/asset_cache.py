@@ -0,0 +1,342 @@
+"""
+Local cache of bungie.net images (item, perk and damage type icons).
+
+Each asset is fetched from the upstream once and stored on disk under the
+SHA-256 of its bytes (blobs/<2 hex>/<digest>), so identical images share a
+file. A small SQLite index shared by the uvicorn workers maps request keys
+(the asset path, plus the width for thumbnails) to blobs and records their
+last use: when the blobs exceed the size cap, the least recently used
+entries are dropped. Bungie content paths never change content, so served
+assets are immutable.
+
+The upstream is any AssetFetcher: bungie.net by default, or a local
+directory (ASSET_UPSTREAM_DIR) as a stand-in for tests and development.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+try:
+    from PIL import Image
+except ImportError:  # Optional dependency: thumbnails are not produced without Pillow
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+ASSET_CACHE_DIRECTORY = Path(os.getenv("ASSET_CACHE_DIR", Path(__file__).parent / "asset_cache"))
+ASSET_CACHE_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_MB", "512")) * 1024 * 1024
+ASSET_UPSTREAM_URL = os.getenv("ASSET_UPSTREAM_URL", "https://www.bungie.net")
+ASSET_UPSTREAM_DIR = os.getenv("ASSET_UPSTREAM_DIR")
+
+# Only images under Bungie's content paths are proxied
+ALLOWED_PREFIXES = ("common/destiny2_content/", "img/")
+ALLOWED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+_SAFE_PATH = re.compile(r"^[A-Za-z0-9_\-./]+$")
+
+# Thumbnail widths accepted by ?w=
+THUMBNAIL_WIDTHS = (48, 96, 192)
+
+# Last use is written at most this often per entry, so hits rarely write
+TOUCH_INTERVAL = 3600
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class AssetNotFoundError(LookupError):
+    """Raised when the upstream has no such asset."""
+
+
+class AssetUpstreamError(RuntimeError):
+    """Raised when the upstream could not be reached or failed."""
+
+
+def normalize_asset_path(path: str) -> str:
+    """
+    Validates an asset path such as common/destiny2_content/icons/<hash>.jpg
+    (a leading slash is accepted).
+
+    Raises:
+        ValueError: if the path is not an allowed image path
+    """
+    path = path.lstrip("/")
+    if (not _SAFE_PATH.match(path) or ".." in path.split("/")
+            or not path.startswith(ALLOWED_PREFIXES) or not path.lower().endswith(ALLOWED_EXTENSIONS)):
+        raise ValueError(f"Not an allowed asset path: {path}")
+    return path
+
+
+class AssetFetcher:
+    """Upstream of the cache. fetch() returns (bytes, content type)."""
+
+    async def fetch(self, path: str) -> Tuple[bytes, str]:
+        """
+        Raises:
+            AssetNotFoundError: if the asset does not exist
+            AssetUpstreamError: if the upstream failed
+        """
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+class BungieAssetFetcher(AssetFetcher):
+    """Fetches assets from bungie.net (or any server with the same paths)."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+                timeout=httpx.Timeout(15.0, connect=5.0),
+            )
+        return self._client
+
+    async def fetch(self, path: str) -> Tuple[bytes, str]:
+        try:
+            response = await self.client.get(f"{self.base_url}/{path}")
+        except httpx.HTTPError as e:
+            raise AssetUpstreamError(str(e)) from e
+        if response.status_code == 404:
+            raise AssetNotFoundError(path)
+        if response.status_code != 200:
+            raise AssetUpstreamError(f"Upstream returned {response.status_code} for {path}")
+        content_type = response.headers.get("content-type") or mimetypes.guess_type(path)[0]
+        return response.content, content_type or "application/octet-stream"
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+
+class LocalAssetFetcher(AssetFetcher):
+    """Serves assets from a local directory laid out like bungie.net."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    async def fetch(self, path: str) -> Tuple[bytes, str]:
+        file_path = self.root / path
+        if not file_path.is_file():
+            raise AssetNotFoundError(path)
+        content = await asyncio.to_thread(file_path.read_bytes)
+        return content, mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def make_thumbnail(content: bytes, width: int) -> Optional[bytes]:
+    """Resizes an image to at most width pixels wide, in its own format. None without Pillow."""
+    if Image is None:
+        return None
+    with Image.open(io.BytesIO(content)) as image:
+        image_format = image.format or "PNG"
+        if image.width <= width:
+            return content
+        image.thumbnail((width, width * image.height // image.width))
+        output = io.BytesIO()
+        image.save(output, format=image_format)
+        return output.getvalue()
+
+
+class CachedAsset:
+    """An asset served from the cache."""
+
+    def __init__(self, content: bytes, content_type: str, digest: str):
+        self.content = content
+        self.content_type = content_type
+        self.etag = f'"{digest[:32]}"'
+
+
+class AssetCache:
+    """
+    Content-addressed on-disk asset cache with a size cap and LRU eviction.
+
+    Concurrent misses of the same key in a worker share one upstream fetch.
+    Disk and index work runs in threads.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, fetcher: AssetFetcher):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._warned_no_thumbnails = False
+
+    # === Index ===
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.directory / "index.sqlite", timeout=10.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS assets (
+                    key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    content_type TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS assets_last_access ON assets (last_access);
+                CREATE INDEX IF NOT EXISTS assets_digest ON assets (digest);
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.directory / "blobs" / digest[:2] / digest
+
+    def _read(self, key: str) -> Optional[CachedAsset]:
+        with self._db_lock:
+            row = self._db().execute(
+                "SELECT digest, content_type, last_access FROM assets WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        digest, content_type, last_access = row
+        try:
+            content = self._blob_path(digest).read_bytes()
+        except FileNotFoundError:
+            # Evicted by another worker meanwhile
+            return None
+        now = time.time()
+        if now - last_access > TOUCH_INTERVAL:
+            with self._db_lock, self._db():
+                self._db().execute("UPDATE assets SET last_access = ? WHERE key = ?", (now, key))
+        return CachedAsset(content, content_type, digest)
+
+    def _write(self, key: str, content: bytes, content_type: str) -> CachedAsset:
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_name(f"{digest}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, blob_path)
+
+        with self._db_lock, self._db():
+            self._db().execute(
+                "INSERT OR REPLACE INTO assets (key, digest, size, content_type, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, digest, len(content), content_type, time.time())
+            )
+        self._evict()
+        return CachedAsset(content, content_type, digest)
+
+    def _evict(self) -> None:
+        """Drops least recently used entries, and their blobs once unreferenced, until under the cap."""
+        with self._db_lock:
+            conn = self._db()
+            total = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM assets GROUP BY digest)"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            with conn:
+                for key, digest, size in conn.execute(
+                        "SELECT key, digest, size FROM assets ORDER BY last_access").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM assets WHERE key = ?", (key,))
+                    self.evictions += 1
+                    if conn.execute("SELECT 1 FROM assets WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+                        self._blob_path(digest).unlink(missing_ok=True)
+                        total -= size
+
+    # === Lookups ===
+
+    async def get(self, path: str, width: Optional[int] = None) -> Tuple[CachedAsset, str]:
+        """
+        Returns (asset, cache status HIT or MISS). With a width, a thumbnail
+        is produced from the cached original when Pillow is available (the
+        original is returned otherwise).
+
+        Raises:
+            AssetNotFoundError: if the upstream has no such asset
+            AssetUpstreamError: if the upstream failed
+        """
+        if width is not None and Image is None:
+            if not self._warned_no_thumbnails:
+                logger.warning("Pillow is not installed: thumbnails are served at full size")
+                self._warned_no_thumbnails = True
+            width = None
+        asset, hit = await self._lookup(path, width)
+        if hit:
+            self.hits += 1
+            return asset, "HIT"
+        self.misses += 1
+        return asset, "MISS"
+
+    async def _lookup(self, path: str, width: Optional[int]) -> Tuple[CachedAsset, bool]:
+        """get without the hit/miss counters: (asset, True if it was cached)."""
+        key = path if width is None else f"{path}@w{width}"
+
+        asset = await asyncio.to_thread(self._read, key)
+        if asset is not None:
+            return asset, True
+
+        shared = self._in_flight.get(key)
+        if shared is None:
+            shared = asyncio.ensure_future(self._load(key, path, width))
+            self._in_flight[key] = shared
+            shared.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(shared), False
+
+    async def _load(self, key: str, path: str, width: Optional[int]) -> CachedAsset:
+        if width is None:
+            content, content_type = await self.fetcher.fetch(path)
+            return await asyncio.to_thread(self._write, key, content, content_type)
+
+        # The original is an internal read, not a client request: it is not counted
+        original, _ = await self._lookup(path, None)
+        try:
+            thumbnail = await asyncio.to_thread(make_thumbnail, original.content, width)
+        except OSError as e:  # Not an image Pillow can read: serve the original
+            logger.warning("Cannot make a thumbnail of %s: %s", path, e)
+            return original
+        return await asyncio.to_thread(self._write, key, thumbnail, original.content_type)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss/eviction counters, entry count and blob bytes."""
+        with self._db_lock:
+            entries, total = self._db().execute(
+                "SELECT COUNT(*), (SELECT COALESCE(SUM(size), 0) FROM "
+                "(SELECT MAX(size) AS size FROM assets GROUP BY digest)) FROM assets"
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes
+        }
+
+
+def default_fetcher() -> AssetFetcher:
+    """A LocalAssetFetcher when ASSET_UPSTREAM_DIR is set, else bungie.net."""
+    if ASSET_UPSTREAM_DIR:
+        return LocalAssetFetcher(Path(ASSET_UPSTREAM_DIR))
+    return BungieAssetFetcher(ASSET_UPSTREAM_URL)
+
+
+asset_cache = AssetCache(ASSET_CACHE_DIRECTORY, ASSET_CACHE_MAX_BYTES, default_fetcher())
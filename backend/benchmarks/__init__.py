@@ -0,0 +1,8 @@
+"""
+Offline benchmarks for the manifest decode pipeline and the API routes.
+
+Run from the repository root (no network access is needed):
+
+    python -m backend.benchmarks --output bench.json
+    python -m backend.benchmarks --compare bench.json
+"""
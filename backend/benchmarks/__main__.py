@@ -0,0 +1,302 @@
+"""
+Runs the offline benchmark suite and writes the results as JSON.
+
+Scenarios:
+    decode_all_cold / decode_all_warm   decode_vendor_data on every vendor
+    decode_xur_cold / decode_xur_warm   decode_vendor_data limited to Xûr
+    xur_route_miss / xur_route_hit      GET /xur/ through the ASGI app
+
+"cold" runs start from an empty definition cache (as after a manifest
+update), "warm" runs reuse it. Route misses rebuild the /xur/ snapshot
+with the definitions already cached by the decode scenarios. Each
+scenario reports latency percentiles, SQLite queries and JSON bytes
+parsed per run.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# bungie_api refuses to import without a key; the benchmarks never reach Bungie
+os.environ.setdefault("BUNGIE_API_KEY", "benchmark")
+
+from backend import bungie_api, manifest_decoder as decoder_module, manifest_index as index_module
+from backend.benchmarks.synthetic import XUR_VENDOR_HASH, build_synthetic_manifest, synthetic_vendor_payload
+from backend.manifest_decoder import manifest_decoder
+from backend.manifest_index import build_manifest_index
+from backend.xur_service import xur_response_cache
+
+logger = logging.getLogger(__name__)
+
+
+class Counters:
+    """SQLite statements and JSON bytes seen while a scenario runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.json_bytes = 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.queries = 0
+            self.json_bytes = 0
+
+    def add_query(self, statement: str) -> None:
+        if statement.lstrip().upper().startswith("SELECT"):
+            with self._lock:
+                self.queries += 1
+
+    def add_json(self, size: int) -> None:
+        with self._lock:
+            self.json_bytes += size
+
+
+class _CountingJson:
+    """Stands in for the json module in the decoder and index, counting parsed bytes."""
+
+    def __init__(self, counters: Counters):
+        self._counters = counters
+
+    def loads(self, data, *args, **kwargs):
+        self._counters.add_json(len(data))
+        return json.loads(data, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+
+def instrument(counters: Counters) -> None:
+    """Counts queries on every decoder connection and bytes parsed by the decoder and index."""
+    traced = set()
+    connect_db = manifest_decoder.connect_db
+
+    def traced_connect_db():
+        conn = connect_db()
+        if id(conn) not in traced:
+            conn.set_trace_callback(counters.add_query)
+            traced.add(id(conn))
+        return conn
+
+    manifest_decoder.connect_db = traced_connect_db
+    decoder_module.json = _CountingJson(counters)
+    index_module.json = _CountingJson(counters)
+
+
+def install_manifest(work_dir: Path, db_source: Optional[Path], item_count: int, with_index: bool) -> Dict[str, List[int]]:
+    """Installs a synthetic (or given) manifest in work_dir and points the decoder at it."""
+    version_dir = work_dir / "versions" / "benchmark"
+    version_dir.mkdir(parents=True)
+    db_path = version_dir / "manifest.sqlite"
+
+    hashes = {}
+    if db_source is None:
+        hashes = build_synthetic_manifest(db_path, item_count=item_count)
+    else:
+        os.symlink(Path(db_source).resolve(), db_path)
+    if with_index:
+        build_manifest_index(db_path, version_dir / "manifest.index")
+
+    with open(work_dir / "manifest_info.json", 'w', encoding='utf-8') as f:
+        json.dump({'version_path': 'benchmark', 'version_dir': 'versions/benchmark'}, f)
+    manifest_decoder.manifest_dir = str(work_dir)
+    manifest_decoder.info_path = str(work_dir / "manifest_info.json")
+    manifest_decoder.reload()
+    return hashes
+
+
+def summarize(durations: List[float], queries: List[int], json_bytes: List[int], **extra) -> Dict[str, Any]:
+    """Latency percentiles (ms) and mean counters per run."""
+    ordered = sorted(durations)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {
+        'runs': len(durations),
+        'latency_ms': {
+            'min': round(ordered[0] * 1000, 3),
+            'p50': round(percentile(0.5) * 1000, 3),
+            'p95': round(percentile(0.95) * 1000, 3),
+            'mean': round(statistics.fmean(durations) * 1000, 3),
+            'max': round(ordered[-1] * 1000, 3)
+        },
+        'sql_queries': statistics.fmean(queries),
+        'json_bytes_parsed': statistics.fmean(json_bytes),
+        **extra
+    }
+
+
+def bench_decode(payloads: List[Dict[str, Any]], counters: Counters, iterations: int,
+                 cold: bool, vendor_hashes: Optional[set]) -> Dict[str, Any]:
+    durations, queries, json_bytes = [], [], []
+    if not cold:
+        manifest_decoder.decode_vendor_data(copy.deepcopy(payloads[0]), vendor_hashes)
+
+    for i in range(iterations):
+        payload = copy.deepcopy(payloads[i % len(payloads)])
+        if cold:
+            manifest_decoder.reload()
+        counters.reset()
+        started = time.perf_counter()
+        manifest_decoder.decode_vendor_data(payload, vendor_hashes)
+        durations.append(time.perf_counter() - started)
+        queries.append(counters.queries)
+        json_bytes.append(counters.json_bytes)
+    return summarize(durations, queries, json_bytes)
+
+
+async def bench_route(payloads: List[Dict[str, Any]], counters: Counters, iterations: int, miss: bool) -> Dict[str, Any]:
+    import httpx
+    from backend.main import app
+
+    # Replayed responses are parsed from bytes, as the Bungie client does
+    raw_payloads = [json.dumps(payload).encode('utf-8') for payload in payloads]
+    calls = {'count': 0}
+
+    async def replay_bungie_request(endpoint: str, params: Optional[dict] = None):
+        calls['count'] += 1
+        return json.loads(raw_payloads[calls['count'] % len(raw_payloads)])
+
+    bungie_api.make_bungie_request = replay_bungie_request
+    durations, queries, json_bytes, sizes = [], [], [], []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        await client.get("/xur/")
+        for _ in range(iterations):
+            if miss:
+                xur_response_cache._entry = None
+            counters.reset()
+            started = time.perf_counter()
+            response = await client.get("/xur/", headers={"Accept-Encoding": "gzip"})
+            durations.append(time.perf_counter() - started)
+            response.raise_for_status()
+            queries.append(counters.queries)
+            json_bytes.append(counters.json_bytes)
+            sizes.append(int(response.headers.get("content-length", len(response.content))))
+    return summarize(durations, queries, json_bytes, response_bytes=statistics.fmean(sizes))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Lists scenarios whose p50 latency, queries or JSON bytes grew by more than threshold."""
+    regressions = []
+    for name, scenario in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        checks = (
+            ('p50 latency', scenario['latency_ms']['p50'], previous['latency_ms']['p50']),
+            ('sql queries', scenario['sql_queries'], previous['sql_queries']),
+            ('json bytes', scenario['json_bytes_parsed'], previous['json_bytes_parsed'])
+        )
+        for label, value, reference in checks:
+            if value > reference * (1 + threshold) and value - reference > 1e-9:
+                regressions.append(f"{name}: {label} {reference:g} -> {value:g}")
+    return regressions
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    counters = Counters()
+    scenarios: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    with tempfile.TemporaryDirectory(prefix="manifest-bench-") as work_dir:
+        hashes = install_manifest(Path(work_dir), args.manifest, args.items, not args.no_index)
+        if args.payload:
+            payloads = []
+            for payload_path in args.payload:
+                with open(payload_path, 'r', encoding='utf-8') as f:
+                    payloads.append(json.load(f))
+        else:
+            payloads = [synthetic_vendor_payload(hashes, vendor_count=args.vendors, seed=seed) for seed in range(3)]
+        instrument(counters)
+
+        xur_only = {str(XUR_VENDOR_HASH)}
+        scenarios['decode_all_cold'] = lambda: bench_decode(payloads, counters, args.iterations, True, None)
+        scenarios['decode_all_warm'] = lambda: bench_decode(payloads, counters, args.iterations, False, None)
+        scenarios['decode_xur_cold'] = lambda: bench_decode(payloads, counters, args.iterations, True, xur_only)
+        scenarios['decode_xur_warm'] = lambda: bench_decode(payloads, counters, args.iterations, False, xur_only)
+        scenarios['xur_route_miss'] = lambda: asyncio.run(bench_route(payloads, counters, args.iterations, True))
+        scenarios['xur_route_hit'] = lambda: asyncio.run(bench_route(payloads, counters, args.iterations, False))
+
+        results = {}
+        for name, scenario in scenarios.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = scenario()
+            logger.info("%-16s p50 %8.3f ms  %6.1f queries  %9.0f JSON bytes", name,
+                        results[name]['latency_ms']['p50'], results[name]['sql_queries'], results[name]['json_bytes_parsed'])
+
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'items': args.items if args.manifest is None else None,
+            'manifest': str(args.manifest) if args.manifest else None,
+            'payloads': [str(p) for p in args.payload] if args.payload else None,
+            'vendors': args.vendors,
+            'index': not args.no_index,
+            'iterations': args.iterations
+        },
+        'scenarios': results
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20000, help="item rows in the synthetic manifest")
+    parser.add_argument("--vendors", type=int, default=20, help="vendors in each synthetic payload")
+    parser.add_argument("--iterations", type=int, default=30, help="runs per scenario")
+    parser.add_argument("--manifest", type=Path, help="use this manifest.sqlite instead of a synthetic one")
+    parser.add_argument("--no-index", action="store_true", help="skip the compact index (SQLite lookups only)")
+    parser.add_argument("--payload", type=Path, action="append", help="recorded /Destiny2/Vendors/ response to replay (repeatable)")
+    parser.add_argument("--only", action="append", help="run only this scenario (repeatable)")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="baseline results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression (default 0.25)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    results = run(args)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding='utf-8')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            logger.error("Regression: %s", regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
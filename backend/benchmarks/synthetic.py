@@ -0,0 +1,182 @@
+"""
+Synthetic manifest and /Destiny2/Vendors/ payloads for the benchmarks.
+
+Table sizes and row shapes follow the live manifest closely enough for the
+lookups to behave the same: signed 32-bit ids, a large item table mixing
+weapons/armor and plugs, and small stat/damage type/socket type tables.
+"""
+import json
+import random
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List
+
+XUR_VENDOR_HASH = 2190858386
+
+# Rough sizes of the live manifest tables (the item table is scaled by --items)
+STAT_COUNT = 120
+DAMAGE_TYPE_COUNT = 8
+SOCKET_TYPE_COUNT = 1200
+VENDOR_COUNT = 600
+
+TABLES = (
+    "DestinyInventoryItemDefinition",
+    "DestinyStatDefinition",
+    "DestinyDamageTypeDefinition",
+    "DestinySocketTypeDefinition",
+    "DestinyVendorDefinition",
+)
+
+
+def _signed(hash_id: int) -> int:
+    return hash_id - 4294967296 if hash_id > 2147483647 else hash_id
+
+
+def _hashes(rnd: random.Random, count: int) -> List[int]:
+    hashes = set()
+    while len(hashes) < count:
+        hashes.add(rnd.getrandbits(32) or 1)
+    return sorted(hashes)
+
+
+def _display_properties(rnd: random.Random, name: str) -> Dict[str, Any]:
+    return {
+        'name': name,
+        'description': ' '.join(rnd.choice(('Lorem', 'ipsum', 'dolor', 'sit', 'amet')) for _ in range(rnd.randint(8, 40))),
+        'icon': f"/common/destiny2_content/icons/{rnd.getrandbits(64):016x}.jpg",
+        'hasIcon': True
+    }
+
+
+def build_synthetic_manifest(db_path: Path, item_count: int = 20000, seed: int = 42) -> Dict[str, List[int]]:
+    """
+    Writes a manifest.sqlite with realistic tables and returns the hashes of
+    each kind of row (items, plugs, stats, vendors) for building payloads.
+    """
+    rnd = random.Random(seed)
+    db_path = Path(db_path)
+    if db_path.exists():
+        db_path.unlink()
+
+    conn = sqlite3.connect(db_path)
+    for table_name in TABLES:
+        conn.execute(f"CREATE TABLE {table_name} (id INTEGER PRIMARY KEY NOT NULL, json BLOB)")
+
+    stat_hashes = _hashes(rnd, STAT_COUNT)
+    damage_type_hashes = _hashes(rnd, DAMAGE_TYPE_COUNT)
+    socket_type_hashes = _hashes(rnd, SOCKET_TYPE_COUNT)
+    vendor_hashes = _hashes(rnd, VENDOR_COUNT - 1) + [XUR_VENDOR_HASH]
+    item_hashes = _hashes(rnd, item_count)
+    plug_hashes = item_hashes[item_count // 2:]
+    gear_hashes = item_hashes[:item_count // 2]
+
+    def insert(table_name: str, hash_id: int, definition: Dict[str, Any]) -> None:
+        definition['hash'] = hash_id
+        conn.execute(f"INSERT OR REPLACE INTO {table_name} VALUES (?, ?)",
+                     (_signed(hash_id), json.dumps(definition).encode('utf-8')))
+
+    for stat_hash in stat_hashes:
+        insert("DestinyStatDefinition", stat_hash, {
+            'displayProperties': _display_properties(rnd, f"Stat {stat_hash}"),
+            'aggregationType': 0, 'statCategory': 1, 'interpolate': True, 'index': 0, 'redacted': False
+        })
+    for damage_type_hash in damage_type_hashes:
+        insert("DestinyDamageTypeDefinition", damage_type_hash, {
+            'displayProperties': _display_properties(rnd, f"Damage {damage_type_hash}"),
+            'color': {'red': rnd.randint(0, 255), 'green': rnd.randint(0, 255), 'blue': rnd.randint(0, 255), 'alpha': 255},
+            'enumValue': rnd.randint(0, 7), 'showIcon': True
+        })
+    for socket_type_hash in socket_type_hashes:
+        insert("DestinySocketTypeDefinition", socket_type_hash, {
+            'plugWhitelist': [{'categoryHash': rnd.getrandbits(32), 'categoryIdentifier': 'frames'}],
+            'socketCategoryHash': rnd.getrandbits(32), 'visibility': 0
+        })
+    for vendor_hash in vendor_hashes:
+        name = "Xûr" if vendor_hash == XUR_VENDOR_HASH else f"Vendor {vendor_hash}"
+        insert("DestinyVendorDefinition", vendor_hash, {
+            'displayProperties': _display_properties(rnd, name),
+            'itemList': [{'itemHash': rnd.choice(gear_hashes), 'vendorItemIndex': i} for i in range(rnd.randint(10, 200))],
+            'categories': [{'categoryIndex': i, 'displayTitle': f"Category {i}"} for i in range(5)]
+        })
+
+    for hash_id in gear_hashes:
+        insert("DestinyInventoryItemDefinition", hash_id, {
+            'displayProperties': _display_properties(rnd, f"Item {hash_id}"),
+            'itemType': rnd.choice((2, 3)), 'itemSubType': rnd.randint(0, 30),
+            'classType': rnd.choice((0, 1, 2, 3)),
+            'inventory': {'tierType': rnd.choice((2, 3, 4, 5, 6)), 'bucketTypeHash': rnd.getrandbits(32), 'maxStackSize': 1},
+            'flavorText': ' '.join('flavor' for _ in range(rnd.randint(5, 30))),
+            'equippingBlock': {'ammoType': rnd.randint(0, 3), 'equipmentSlotTypeHash': rnd.getrandbits(32)},
+            'defaultDamageTypeHash': rnd.choice(damage_type_hashes),
+            'stats': {'stats': {str(s): {'statHash': s, 'value': rnd.randint(1, 100), 'maximum': 100}
+                                for s in rnd.sample(stat_hashes, 8)}},
+            'investmentStats': [{'statTypeHash': s, 'value': rnd.randint(0, 10), 'isConditionallyActive': False}
+                                for s in rnd.sample(stat_hashes, 6)],
+            'sockets': {'socketEntries': [{'socketTypeHash': rnd.choice(socket_type_hashes),
+                                           'singleInitialItemHash': rnd.choice(plug_hashes),
+                                           'reusablePlugItems': [{'plugItemHash': rnd.choice(plug_hashes)} for _ in range(4)]}
+                                          for _ in range(rnd.randint(4, 12))]},
+            'screenshot': f"/common/destiny2_content/screenshots/{hash_id}.jpg",
+            'tooltipNotifications': [], 'traitIds': ['item_type.weapon'], 'redacted': False
+        })
+    for hash_id in plug_hashes:
+        insert("DestinyInventoryItemDefinition", hash_id, {
+            'displayProperties': _display_properties(rnd, f"Plug {hash_id}" if rnd.random() > 0.05 else ""),
+            'itemType': 19, 'itemSubType': 0,
+            'inventory': {'tierType': rnd.choice((2, 3, 4, 5, 6))},
+            'plug': {'plugCategoryHash': rnd.getrandbits(32), 'plugCategoryIdentifier': 'frames'},
+            'investmentStats': [{'statTypeHash': s, 'value': rnd.randint(-10, 10)} for s in rnd.sample(stat_hashes, 2)],
+            'perks': [{'perkHash': rnd.getrandbits(32), 'perkVisibility': 0}], 'redacted': False
+        })
+
+    conn.commit()
+    conn.close()
+    return {'items': gear_hashes, 'plugs': plug_hashes, 'stats': stat_hashes, 'vendors': vendor_hashes}
+
+
+def synthetic_vendor_payload(hashes: Dict[str, List[int]], vendor_count: int = 20,
+                             sales_per_vendor: int = 40, seed: int = 7) -> Dict[str, Any]:
+    """
+    Builds a /Destiny2/Vendors/ response with Xûr and vendor_count - 1 other
+    vendors, each selling instanced items with sockets and stats.
+    """
+    rnd = random.Random(seed)
+    vendors, sales, instances, sockets, stats = {}, {}, {}, {}, {}
+    vendor_hashes = [XUR_VENDOR_HASH] + rnd.sample([h for h in hashes['vendors'] if h != XUR_VENDOR_HASH], vendor_count - 1)
+
+    instance_index = 0
+    for vendor_hash in vendor_hashes:
+        vendors[str(vendor_hash)] = {
+            'vendorHash': vendor_hash, 'enabled': True, 'canPurchase': True,
+            'nextRefreshDate': '2099-01-01T17:00:00Z', 'progression': {'level': 0}
+        }
+        sale_items = {}
+        for _ in range(sales_per_vendor):
+            key = str(instance_index)
+            sale_items[key] = {
+                'vendorItemIndex': instance_index,
+                'itemHash': rnd.choice(hashes['items']),
+                'quantity': 1, 'saleStatus': 0,
+                'costs': [{'itemHash': rnd.choice(hashes['items']), 'quantity': rnd.randint(1, 50)}]
+            }
+            instances[key] = {'primaryStat': {'statHash': rnd.choice(hashes['stats']), 'value': rnd.randint(1800, 2000)},
+                              'damageType': 1, 'itemLevel': 200, 'quality': 0, 'isEquipped': False}
+            sockets[key] = {'sockets': [{'plugHash': rnd.choice(hashes['plugs']), 'isEnabled': True, 'isVisible': True}
+                                        for _ in range(rnd.randint(4, 10))]}
+            stats[key] = {'stats': {str(s): {'statHash': s, 'value': rnd.randint(2, 42)} for s in rnd.sample(hashes['stats'], 6)}}
+            instance_index += 1
+        sales[str(vendor_hash)] = {'saleItems': sale_items}
+
+    return {
+        'Response': {
+            'vendors': {'data': vendors},
+            'sales': {'data': sales},
+            'itemInstances': {'data': instances},
+            'itemSockets': {'data': sockets},
+            'itemStats': {'data': stats}
+        },
+        'ErrorCode': 1,
+        'ThrottleSeconds': 0,
+        'ErrorStatus': 'Success',
+        'Message': 'Ok'
+    }
@@ -1,18 +1,192 @@
+import asyncio
+import copy
+import importlib.util
+import logging
 import os
-from typing import Optional
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
 
 import httpx
 from dotenv import load_dotenv
 
+from .metrics import bungie_error_codes, bungie_request_duration, bungie_requests
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 BUNGIE_API_KEY = os.getenv("BUNGIE_API_KEY")
 if BUNGIE_API_KEY is None:
     raise ValueError("BUNGIE_API_KEY environment variable is not set.")
 
 BUNGIE_API_URL = "https://www.bungie.net/Platform"
 
-async_client = httpx.AsyncClient()
+# Bungie allows about 25 requests per second per API key; stay below it
+RATE_LIMIT_PER_SECOND = float(os.getenv("BUNGIE_RATE_LIMIT_PER_SECOND", "20"))
+RATE_LIMIT_BURST = int(os.getenv("BUNGIE_RATE_LIMIT_BURST", "25"))
+
+# Retries on 5xx responses and timeouts
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+
+class TokenBucket:
+    """Async token bucket limiting the request rate sent to Bungie."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Holds every request for the given time (Bungie's ThrottleSeconds)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        """Waits until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BungieClient:
+    """
+    Upstream client for the Bungie.net API.
+
+    Identical concurrent calls share a single request, the request rate is
+    limited by a token bucket, and 5xx responses and timeouts are retried
+    with bounded exponential backoff and jitter.
+    """
+
+    def __init__(self):
+        self.limiter = TokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight: Dict[Tuple, Dict[str, Any]] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                # HTTP/2 needs the optional h2 package (httpx[http2])
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+                timeout=httpx.Timeout(10.0, connect=5.0),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def get(self, endpoint: str, params: Optional[dict] = None) -> Optional[Dict[str, Any]]:
+        """
+        GETs an endpoint, joining an identical request already in flight.
+
+        When the result was shared with other callers, each caller receives
+        its own copy since callers decode the payload in place.
+        """
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        shared = self._in_flight.get(key)
+        if shared is None:
+            shared = {'task': asyncio.ensure_future(self._fetch(key, endpoint, params)), 'waiters': 0}
+            self._in_flight[key] = shared
+        shared['waiters'] += 1
+
+        data = await asyncio.shield(shared['task'])
+        if data is not None and shared['waiters'] > 1:
+            return copy.deepcopy(data)
+        return data
+
+    async def _fetch(self, key: Tuple, endpoint: str, params: Optional[dict]) -> Optional[Dict[str, Any]]:
+        try:
+            return await self._request_with_retries(endpoint, params)
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def _request_with_retries(self, endpoint: str, params: Optional[dict]) -> Optional[Dict[str, Any]]:
+        headers = {"X-API-Key": str(BUNGIE_API_KEY)}
+        url = f"{BUNGIE_API_URL}{endpoint}"
+
+        for attempt in range(MAX_RETRIES + 1):
+            await self.limiter.acquire()
+            try:
+                response = await self._send(endpoint, url, headers, params)
+                response.raise_for_status()  # Raise an exception for non-200 status codes
+                data = response.json()
+            except httpx.HTTPStatusError as exc:
+                # Handle HTTP errors (e.g., 4xx, 5xx)
+                status_code = exc.response.status_code
+                if status_code >= 500 and attempt < MAX_RETRIES:
+                    await self._backoff(attempt, f"HTTP {status_code}", url)
+                    continue
+                logger.error("Error response %d while requesting %r.", status_code, str(exc.request.url))
+                return None
+            except httpx.TimeoutException as exc:
+                if attempt < MAX_RETRIES:
+                    await self._backoff(attempt, "timeout", url)
+                    continue
+                logger.error("Timed out while requesting %r.", str(exc.request.url))
+                return None
+            except httpx.RequestError as exc:
+                # Handle other request errors (e.g., network issues)
+                logger.error("An error occurred while requesting %r: %s", str(exc.request.url), exc)
+                return None
+            except ValueError as exc:
+                logger.error("Invalid JSON received from %r: %s", url, exc)
+                return None
+
+            error_code = data.get('ErrorCode') if isinstance(data, dict) else None
+            if error_code not in (None, 1):
+                bungie_error_codes.inc(endpoint=endpoint, error_code=error_code)
+
+            throttle_seconds = data.get('ThrottleSeconds', 0) if isinstance(data, dict) else 0
+            if throttle_seconds:
+                logger.warning("Bungie asked to throttle for %s seconds", throttle_seconds)
+                self.limiter.pause(throttle_seconds)
+            return data
+
+        return None
+
+    async def _send(self, endpoint: str, url: str, headers: dict, params: Optional[dict]) -> httpx.Response:
+        """Sends one request, recording its latency and outcome (status code, timeout or error)."""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self.client.get(url, headers=headers, params=params)
+            outcome = str(response.status_code)
+            return response
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise
+        finally:
+            bungie_requests.inc(endpoint=endpoint, outcome=outcome)
+            bungie_request_duration.observe(time.perf_counter() - started, endpoint=endpoint)
+
+    async def _backoff(self, attempt: int, reason: str, url: str) -> None:
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+        delay = random.uniform(delay / 2, delay)
+        logger.warning("Retrying %s after %s in %.2fs (attempt %d/%d)", url, reason, delay, attempt + 1, MAX_RETRIES)
+        await asyncio.sleep(delay)
+
+
+bungie_client = BungieClient()
+
+
 async def make_bungie_request(endpoint: str, params: Optional[dict] = None):
     """
     Makes an authenticated GET request to the Bungie.net API.
@@ -22,20 +196,6 @@ async def make_bungie_request(endpoint: str, params: Optional[dict] = None):
         params: A dictionary of query parameters.
 
     Returns:
-        The JSON response from the API as a dictionary.
+        The JSON response from the API as a dictionary, or None on error.
     """
-    headers = {"X-API-Key": str(BUNGIE_API_KEY)}
-    url = f"{BUNGIE_API_URL}{endpoint}"
-
-    try:
-        response = await async_client.get(url, headers=headers, params=params)
-        response.raise_for_status()  # Raise an exception for non-200 status codes
-        return response.json()
-    except httpx.HTTPStatusError as exc:
-        # Handle HTTP errors (e.g., 4xx, 5xx)
-        print(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}.")
-        return None
-    except httpx.RequestError as exc:
-        # Handle other request errors (e.g., network issues)
-        print(f"An error occurred while requesting {exc.request.url!r}.")
-        return None
+    return await bungie_client.get(endpoint, params=params)
@@ -0,0 +1,104 @@
+"""
+Bounded thread pool running manifest decoding off the asyncio event loop
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+DECODE_POOL_WORKERS = int(os.getenv("DECODE_POOL_WORKERS", "4"))
+DECODE_QUEUE_LIMIT = int(os.getenv("DECODE_QUEUE_LIMIT", "32"))
+DECODE_TIMEOUT_SECONDS = float(os.getenv("DECODE_TIMEOUT_SECONDS", "20"))
+
+
+class DecodePoolFullError(RuntimeError):
+    """Raised when too many decodes are already waiting for a worker."""
+
+
+class DecodePool:
+    """
+    Runs blocking decode work (SQLite lookups, JSON parsing) in dedicated
+    threads so the event loop keeps serving other requests.
+
+    A thread pool is used rather than a process pool because the definition
+    caches and SQLite connections live in this process. The number of
+    pending jobs is bounded and every job has a timeout; a job that times
+    out keeps its worker until it finishes, but its caller is released.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, timeout: float):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="decode")
+        self._lock = threading.Lock()
+        self._counters = {
+            'queued': 0,
+            'active': 0,
+            'completed': 0,
+            'failed': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'max_queue_depth': 0
+        }
+
+    def _run_tracked(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            self._counters['queued'] -= 1
+            self._counters['active'] += 1
+        try:
+            result = fn(*args)
+        except Exception:
+            with self._lock:
+                self._counters['failed'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._counters['active'] -= 1
+        with self._lock:
+            self._counters['completed'] += 1
+        return result
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Runs fn(*args) in the pool and waits for it (context variables are
+        propagated to the worker thread).
+
+        Raises:
+            DecodePoolFullError: if max_pending jobs are already queued or running
+            asyncio.TimeoutError: if the job did not finish within the timeout
+        """
+        with self._lock:
+            if self._counters['queued'] + self._counters['active'] >= self.max_pending:
+                self._counters['rejected'] += 1
+                raise DecodePoolFullError("Too many decodes in progress")
+            self._counters['queued'] += 1
+            self._counters['max_queue_depth'] = max(self._counters['max_queue_depth'], self._counters['queued'])
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(self._executor, context.run, self._run_tracked, fn, *args)
+        try:
+            # Shielded so a queued job still runs (and is accounted for) after a timeout
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._counters['timeouts'] += 1
+            logger.error("Decode timed out after %.1fs", self.timeout)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns queue depth and job counters."""
+        with self._lock:
+            return {'workers': self.max_workers, 'max_pending': self.max_pending, **self._counters}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+decode_pool = DecodePool(DECODE_POOL_WORKERS, DECODE_QUEUE_LIMIT, DECODE_TIMEOUT_SECONDS)
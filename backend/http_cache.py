@@ -0,0 +1,103 @@
+"""
+HTTP caching helpers: pre-encoded JSON bodies, ETags and conditional GET
+"""
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+from .request_timing import timed
+
+try:
+    import brotli
+except ImportError:  # Optional dependency, gzip is used when missing
+    brotli = None
+
+
+class EncodedBody:
+    """
+    A JSON body serialized once, with its ETag and compressed variants.
+
+    Compressed variants are produced on first use and then reused, so a
+    cached body is never serialized or compressed again per request.
+    """
+
+    def __init__(self, content: Any):
+        # Same encoding as FastAPI's JSONResponse
+        self.raw = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.raw).hexdigest()[:32]}"'
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        """Returns the body compressed with 'br' or 'gzip'."""
+        if encoding not in self._encoded:
+            with timed("serialize"):
+                self._encode(encoding)
+        return self._encoded[encoding]
+
+    def _encode(self, encoding: str) -> None:
+        if encoding == "br":
+            self._encoded[encoding] = brotli.compress(self.raw, quality=9)
+        else:
+            self._encoded[encoding] = gzip.compress(self.raw, compresslevel=6)
+
+
+def _accepted_codings(accept_encoding: str) -> Dict[str, float]:
+    """Parses an Accept-Encoding header into coding -> q value."""
+    codings: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def _accepted_encoding(request: Request) -> Optional[str]:
+    """br when the client accepts it (and brotli is installed), else gzip, else None."""
+    codings = _accepted_codings(request.headers.get("accept-encoding", ""))
+    candidates = ("br", "gzip") if brotli is not None else ("gzip",)
+    for encoding in candidates:
+        # A coding not listed falls back to the "*" wildcard; q=0 means "not acceptable"
+        if codings.get(encoding, codings.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Checks an If-None-Match header against an ETag (weak comparison)."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cached_json_response(request: Request, body: EncodedBody, cache_control: str,
+                         headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serves a pre-encoded body: 304 when the client already has it,
+    otherwise the compressed variant the client accepts.
+    """
+    response_headers = {"ETag": body.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    response_headers.update(headers or {})
+
+    if etag_matches(request, body.etag):
+        return Response(status_code=304, headers=response_headers)
+
+    encoding = _accepted_encoding(request)
+    if encoding is None:
+        return Response(content=body.raw, media_type="application/json", headers=response_headers)
+
+    response_headers["Content-Encoding"] = encoding
+    return Response(content=body.encoded(encoding), media_type="application/json", headers=response_headers)
@@ -0,0 +1,123 @@
+"""
+Bulk item details service: decoding and response caching per manifest version
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from backend.decode_pool import decode_pool
+from backend.http_cache import EncodedBody
+from backend.manifest_decoder import ManifestDecoder
+
+# Most hashes accepted by one /items request
+MAX_ITEMS_PER_REQUEST = 100
+
+# A response is immutable when its URL names the manifest version it was decoded from
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+UNVERSIONED_CACHE_CONTROL = "public, max-age=300"
+
+
+def manifest_version_tag(version: str) -> str:
+    """Short, URL-safe tag of a manifest version, used as the ?v= of /items."""
+    return hashlib.sha1(version.encode("utf-8")).hexdigest()[:12]
+
+
+def parse_item_hashes(values: Iterable[Any]) -> Tuple[int, ...]:
+    """
+    Sorted, de-duplicated item hashes from numbers or comma-separated strings.
+
+    Raises:
+        ValueError: if a value is not an unsigned 32-bit hash, or there are
+        none or more than MAX_ITEMS_PER_REQUEST
+    """
+    hashes = set()
+    for value in values:
+        for part in str(value).split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit() or int(part) > 0xFFFFFFFF:
+                raise ValueError(f"Invalid item hash: {part}")
+            hashes.add(int(part))
+    if not hashes:
+        raise ValueError("No item hashes given")
+    if len(hashes) > MAX_ITEMS_PER_REQUEST:
+        raise ValueError(f"At most {MAX_ITEMS_PER_REQUEST} item hashes per request")
+    return tuple(sorted(hashes))
+
+
+class ItemsResponseCache:
+    """
+    Bounded LRU of encoded /items bodies, keyed on the locale, the manifest
+    version and the requested hashes. A body never changes for a given
+    manifest version, so entries are only dropped by the LRU; bodies of a
+    replaced version simply stop being requested.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Tuple) -> Optional[EncodedBody]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def _store(self, key: Tuple, body: EncodedBody) -> None:
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get(self, decoder: ManifestDecoder, item_hashes: Tuple[int, ...]) -> Tuple[str, EncodedBody, str]:
+        """
+        Returns (manifest version tag, body, cache status HIT or MISS) for the
+        decoder's current manifest version. The body maps each hash to its
+        details, or null for an unknown hash.
+
+        Raises:
+            DecodePoolFullError: if too many decodes are in progress
+            asyncio.TimeoutError: if the decode timed out
+        """
+        version = decoder.manifest_version
+        body = self._lookup((decoder.locale, version, item_hashes))
+        if body is not None:
+            return manifest_version_tag(version), body, "HIT"
+
+        # Keyed on the version actually decoded, in case of a swap meanwhile
+        version, body = await decode_pool.run(self._build, decoder, item_hashes)
+        self._store((decoder.locale, version, item_hashes), body)
+        return manifest_version_tag(version), body, "MISS"
+
+    @staticmethod
+    def _build(decoder: ManifestDecoder, item_hashes: Tuple[int, ...]) -> Tuple[str, EncodedBody]:
+        with decoder.pinned_version() as state:
+            details = decoder.get_items_detailed_info(item_hashes)
+        return state.version, EncodedBody({
+            'manifestVersion': manifest_version_tag(state.version),
+            'lang': decoder.locale,
+            'items': {str(item_hash): details[item_hash] for item_hash in item_hashes}
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+
+items_response_cache = ItemsResponseCache()
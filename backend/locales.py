@@ -0,0 +1,88 @@
+"""
+Manifest locales and the choice of locale for a request
+"""
+import os
+from typing import Optional, Tuple
+
+DEFAULT_LOCALE = "en"
+
+# Locales of Bungie's mobileWorldContentPaths
+SUPPORTED_LOCALES = (
+    "en", "fr", "es", "es-mx", "de", "it", "ja", "pt-br", "ru", "pl", "ko", "zh-cht", "zh-chs",
+)
+
+
+def _locale_list(value: str) -> Tuple[str, ...]:
+    """Supported locales of a comma-separated list ("all" for every supported locale)."""
+    if value.strip().lower() == "all":
+        return SUPPORTED_LOCALES
+    return tuple(
+        locale.strip().lower() for locale in value.split(",")
+        if locale.strip().lower() in SUPPORTED_LOCALES
+    )
+
+
+# Locales installed with every manifest update
+MANIFEST_LOCALES: Tuple[str, ...] = _locale_list(os.getenv("MANIFEST_LOCALES", DEFAULT_LOCALE))
+
+# Locales installed on their first request, then updated like MANIFEST_LOCALES (none by default)
+MANIFEST_ON_DEMAND_LOCALES: Tuple[str, ...] = _locale_list(os.getenv("MANIFEST_ON_DEMAND_LOCALES", ""))
+
+
+def is_installable_locale(locale: str) -> bool:
+    """Whether the manifest of a locale may be installed and kept up to date."""
+    return locale in MANIFEST_LOCALES or locale in MANIFEST_ON_DEMAND_LOCALES
+
+# Language tags that do not map to a locale by their primary subtag
+_TAG_ALIASES = {
+    "es-mx": "es-mx", "es-419": "es-mx",
+    "pt": "pt-br", "pt-br": "pt-br", "pt-pt": "pt-br",
+    "zh-tw": "zh-cht", "zh-hk": "zh-cht", "zh-hant": "zh-cht", "zh-cht": "zh-cht",
+    "zh": "zh-chs", "zh-cn": "zh-chs", "zh-sg": "zh-chs", "zh-hans": "zh-chs", "zh-chs": "zh-chs",
+}
+
+
+def locale_for_tag(tag: str) -> Optional[str]:
+    """Maps a language tag such as 'fr-FR' or 'zh-Hant-TW' to a manifest locale."""
+    tag = tag.strip().lower().replace("_", "-")
+    if not tag:
+        return None
+    parts = tag.split("-")
+    for length in range(len(parts), 0, -1):
+        candidate = "-".join(parts[:length])
+        if candidate in _TAG_ALIASES:
+            return _TAG_ALIASES[candidate]
+        if candidate in SUPPORTED_LOCALES:
+            return candidate
+    return None
+
+
+def negotiate_locale(lang: Optional[str] = None, accept_language: Optional[str] = None) -> str:
+    """
+    Picks the locale of a request: the ?lang= parameter when supported,
+    else the best Accept-Language entry, else DEFAULT_LOCALE.
+    """
+    if lang:
+        locale = locale_for_tag(lang)
+        if locale:
+            return locale
+
+    candidates = []
+    for position, entry in enumerate((accept_language or "").split(",")):
+        tag, _, params = entry.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        candidates.append((-quality, position, tag))
+
+    for negative_quality, _, tag in sorted(candidates):
+        if negative_quality >= 0:
+            break
+        locale = locale_for_tag(tag)
+        if locale:
+            return locale
+    return DEFAULT_LOCALE
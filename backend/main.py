@@ -1,17 +1,35 @@
 import asyncio
 import logging
+import os
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import xur, general, manifest
-from .manifest_manager import update_manifest_if_needed
+from .routers import xur, general, assets, items, manifest, metrics
+from . import bungie_api
+from .metrics import http_request_duration, monitor_event_loop_lag
+from .request_timing import start_request_timings
+from .manifest_manager import manifest_leader, update_manifest_if_needed
+from .manifest_decoder import manifest_decoder, manifest_decoders
+from .decode_pool import decode_pool
+from .asset_cache import asset_cache
+from .xur_service import (
+    follow_xur_snapshots, refresh_xur_snapshots, next_snapshot_delay,
+    SNAPSHOT_FOLLOW_INTERVAL, SNAPSHOT_RETRY_BASE, SNAPSHOT_RETRY_MAX
+)
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global variable for periodic task
+# How often workers check manifest_info.json for a version installed by another worker
+MANIFEST_WATCH_INTERVAL = float(os.getenv("MANIFEST_WATCH_INTERVAL", "30"))
+
+# Global variables for periodic tasks
 periodic_task = None
+snapshot_task = None
+lag_task = None
+coordinator_task = None
 
 async def periodic_manifest_update():
     """Periodic task to update the manifest every week"""
@@ -26,37 +44,106 @@ async def periodic_manifest_update():
         # Wait 7 days (604800 seconds)
         await asyncio.sleep(604800)
 
+async def manifest_coordinator():
+    """
+    Follows manifest installs made by other workers, and takes over the
+    weekly update when the leader worker is gone
+    """
+    global periodic_task
+    while True:
+        await asyncio.sleep(MANIFEST_WATCH_INTERVAL)
+        if not manifest_leader.is_leader and manifest_leader.try_acquire():
+            logger.info("👑 Taking over manifest updates")
+            periodic_task = asyncio.create_task(periodic_manifest_update())
+        try:
+            for locale in await asyncio.to_thread(manifest_decoders.reload_if_changed):
+                logger.info("🔁 Manifest reloaded (%s): %s", locale, manifest_decoders.current_version(locale))
+        except Exception as e:
+            logger.error(f"❌ Error while reloading the manifest: {e}")
+
+async def periodic_xur_snapshot():
+    """
+    Rebuilds the Xûr snapshots after each arrival/reset and regularly while
+    he is present. Only the leader worker calls Bungie; the others rebuild
+    theirs from the payload it shares, and become fetchers if they take over
+    """
+    failures = 0
+    while True:
+        if not manifest_leader.is_leader:
+            try:
+                if await follow_xur_snapshots():
+                    logger.info("📸 Xûr snapshot rebuilt from the leader's payload")
+            except Exception as e:
+                logger.error(f"❌ Error while following the Xûr snapshot: {e}")
+            await asyncio.sleep(SNAPSHOT_FOLLOW_INTERVAL)
+            continue
+
+        try:
+            refreshed = await refresh_xur_snapshots()
+        except Exception as e:
+            logger.error(f"❌ Error during Xûr snapshot build: {e}")
+            refreshed = False
+
+        if refreshed:
+            failures = 0
+            delay = next_snapshot_delay()
+            logger.info("📸 Xûr snapshot built, next build in %ds", delay)
+        else:
+            # Back off while Bungie is failing
+            failures += 1
+            delay = min(SNAPSHOT_RETRY_MAX, SNAPSHOT_RETRY_BASE * 2 ** (failures - 1))
+            logger.warning("⚠️ Xûr snapshot build failed (%d), retrying in %ds", failures, delay)
+
+        await asyncio.sleep(delay)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifecycle manager"""
-    global periodic_task
+    global periodic_task, snapshot_task, lag_task, coordinator_task
     
     # Startup
     logger.info("🚀 Starting Orbit Market API...")
     
-    # Download manifest on startup
-    logger.info("📥 Initial manifest download...")
-    try:
-        await update_manifest_if_needed()
-        logger.info("✅ Manifest initialized successfully")
-    except Exception as e:
-        logger.error("❌ Error during manifest initialization: %s", e)
-        logger.warning("⚠️ API will continue running but some features may be limited")
-    
-    # Start periodic task
-    logger.info("⏰ Starting weekly manifest update...")
-    periodic_task = asyncio.create_task(periodic_manifest_update())
+    # Serve the manifest already on disk right away; a missing one is
+    # reported by /health/ready until the update below installs it
+    manifest_decoder.reload_if_changed()
+    manifest_decoder.preload_small_tables()
+    if manifest_decoder.is_ready():
+        logger.info("✅ Manifest loaded: %s", manifest_decoder.manifest_version)
+    else:
+        logger.warning("⚠️ No usable manifest on disk yet, waiting for the update")
+
+    # Only one worker (the leader) downloads and installs manifests. The
+    # update check runs in the background, starting now, then every week
+    if manifest_leader.try_acquire():
+        logger.info("⏰ Starting manifest update check in the background...")
+        periodic_task = asyncio.create_task(periodic_manifest_update())
+    else:
+        logger.info("👥 Another worker manages manifest updates, using the installed manifest")
+    coordinator_task = asyncio.create_task(manifest_coordinator())
+
+    # Start Xûr snapshot builder
+    logger.info("📸 Starting Xûr snapshot builder...")
+    snapshot_task = asyncio.create_task(periodic_xur_snapshot())
+
+    lag_task = asyncio.create_task(monitor_event_loop_lag())
     
     yield
     
     # Shutdown
     logger.info("🛑 Stopping API...")
-    if periodic_task:
-        periodic_task.cancel()
-        try:
-            await periodic_task
-        except asyncio.CancelledError:
-            logger.info("✅ Periodic task stopped")
+    for task in (periodic_task, snapshot_task, lag_task, coordinator_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                logger.info("✅ Periodic task stopped")
+
+    await bungie_api.bungie_client.aclose()
+    await asset_cache.fetcher.aclose()
+    decode_pool.shutdown()
+    manifest_leader.release()
 
 app = FastAPI(
     title="Orbit Market API",
@@ -74,7 +161,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    """
+    Records the latency of every request, labelled with its route template,
+    and reports the request's phase timings in a Server-Timing header
+    """
+    started = time.perf_counter()
+    timings = start_request_timings()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["Server-Timing"] = timings.header()
+        # Lets browser dev tools of other origins (the web app) read the timings
+        response.headers["Timing-Allow-Origin"] = "*"
+        return response
+    finally:
+        route = request.scope.get("route")
+        http_request_duration.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
 # Include all routers
 app.include_router(general.router)
 app.include_router(xur.router)
+app.include_router(items.router)
+app.include_router(assets.router)
 app.include_router(manifest.router)
+app.include_router(metrics.router)
@@ -1,7 +1,300 @@
+import asyncio
 import sqlite3
 import json
+import logging
 import os
-from typing import Dict, List, Optional, Any
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Any, Set, Tuple
+
+from .decode_pool import decode_pool
+from .locales import DEFAULT_LOCALE
+from .metrics import manifest_lookup_duration, manifest_lookups
+from .profiling import profile_phase
+from .request_timing import record_lookups, timed
+from .manifest_diff import invalidated_hashes, read_manifest_diff
+from .manifest_index import ManifestIndex
+from .manifest_search import ITEM_TYPES, ManifestSearch
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class DefinitionCache:
+    """Bounded per-table LRU cache of parsed manifest definitions."""
+
+    def __init__(self, max_entries_per_table: int = 4096):
+        self.max_entries_per_table = max_entries_per_table
+        self._tables: Dict[str, OrderedDict] = {}
+        self._pinned: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, table_name: str, hash_id: int) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Returns (found, definition). A cached miss is returned as (True, None)."""
+        with self._lock:
+            stats = self._stats.setdefault(table_name, {'hits': 0, 'misses': 0})
+
+            pinned = self._pinned.get(table_name)
+            if pinned is not None:
+                stats['hits'] += 1
+                return True, pinned.get(hash_id)
+
+            table = self._tables.get(table_name)
+            value = table.get(hash_id, _MISSING) if table is not None else _MISSING
+            if value is _MISSING:
+                stats['misses'] += 1
+                return False, None
+
+            table.move_to_end(hash_id)
+            stats['hits'] += 1
+            return True, value
+
+    def put(self, table_name: str, hash_id: int, definition: Optional[Dict[str, Any]]) -> None:
+        """Stores a definition (or a known-missing row as None)."""
+        with self._lock:
+            if table_name in self._pinned:
+                return
+            table = self._tables.setdefault(table_name, OrderedDict())
+            table[hash_id] = definition
+            table.move_to_end(hash_id)
+            while len(table) > self.max_entries_per_table:
+                table.popitem(last=False)
+
+    def pin_table(self, table_name: str, definitions: Dict[int, Dict[str, Any]]) -> None:
+        """Keeps a fully loaded table in memory, outside the LRU bound."""
+        with self._lock:
+            self._pinned[table_name] = definitions
+            self._tables.pop(table_name, None)
+
+    def is_pinned(self, table_name: str) -> bool:
+        return table_name in self._pinned
+
+    def carry_over(self, previous: 'DefinitionCache', stale_hashes: Dict[str, set]) -> int:
+        """
+        Copies the LRU entries of the previous version's cache, except the
+        hashes listed in stale_hashes. Returns the number of entries kept.
+        """
+        with previous._lock:
+            snapshot = {table_name: list(table.items()) for table_name, table in previous._tables.items()}
+
+        kept = 0
+        with self._lock:
+            for table_name, entries in snapshot.items():
+                stale = stale_hashes.get(table_name, set())
+                table = self._tables.setdefault(table_name, OrderedDict())
+                for hash_id, definition in entries:
+                    if hash_id not in stale:
+                        table[hash_id] = definition
+                        kept += 1
+        return kept
+
+    def clear(self) -> None:
+        """Drops every cached definition and resets the counters."""
+        with self._lock:
+            self._tables.clear()
+            self._pinned.clear()
+            self._stats.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and sizes per table."""
+        with self._lock:
+            tables = {}
+            for table_name in set(self._stats) | set(self._tables) | set(self._pinned):
+                counters = self._stats.get(table_name, {'hits': 0, 'misses': 0})
+                size = len(self._pinned[table_name]) if table_name in self._pinned else len(self._tables.get(table_name, ()))
+                tables[table_name] = {
+                    'hits': counters['hits'],
+                    'misses': counters['misses'],
+                    'size': size,
+                    'pinned': table_name in self._pinned
+                }
+            return {
+                'hits': sum(t['hits'] for t in tables.values()),
+                'misses': sum(t['misses'] for t in tables.values()),
+                'tables': tables
+            }
+
+
+class FrozenDict(dict):
+    """
+    A dict that refuses mutation, so memoized records can be shared between
+    responses. Callers that need to modify one work on a copy:
+    copy.deepcopy() (or thaw()) returns plain dicts and lists, and pickling
+    stores a plain dict.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict is read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return hash(tuple(sorted(self.items(), key=repr)))
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+
+def freeze(value: Any) -> Any:
+    """Recursively converts dicts to FrozenDict and lists to tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Mutable copy of a frozen value: FrozenDicts become dicts and tuples lists."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ItemDetailMemo:
+    """
+    Bounded LRU of built item details, keyed on everything the result depends
+    on: manifest version, item hash, instance plugs, instance stats and power.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(version: str, item_hash: int, item_instance_data: Optional[Dict],
+                 sockets_data: Optional[Dict], stats_data: Optional[Dict]) -> Tuple:
+        plugs = tuple(
+            (socket.get('plugHash'), bool(socket.get('isEnabled', False)))
+            for socket in (sockets_data or {}).get('sockets', [])
+        )
+        stats = tuple(sorted(
+            (str(stat_hash), stat_value.get('value', 0))
+            for stat_hash, stat_value in (stats_data or {}).get('stats', {}).items()
+        ))
+        power = (item_instance_data or {}).get('primaryStat', {}).get('value')
+        has_sockets = bool(sockets_data and 'sockets' in sockets_data)
+        return version, int(item_hash), has_sockets, plugs, stats, power
+
+    def get(self, key: Tuple) -> Tuple[bool, Optional[FrozenDict]]:
+        """Returns (found, details). A memoized unknown item is returned as (True, None)."""
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def __contains__(self, key: Tuple) -> bool:
+        """Membership test that leaves the counters and LRU order unchanged."""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Tuple, details: Optional[FrozenDict]) -> None:
+        with self._lock:
+            self._entries[key] = details
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters, hit ratio and size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'size': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+
+class ManifestState:
+    """One installed manifest version: its files, compact index and definition cache."""
+
+    # Rough resident size of one cached definition and one memoized item detail
+    DEFINITION_BYTES = 3 * 1024
+    ITEM_DETAIL_BYTES = 6 * 1024
+
+    def __init__(self, version: str, directory: str, db_path: str, index_path: str, generation: int,
+                 search_path: str = ""):
+        self.version = version
+        self.directory = directory
+        self.db_path = db_path
+        self.index_path = index_path
+        self.search_path = search_path
+        self.generation = generation
+        self.cache = DefinitionCache()
+        self.item_details = ItemDetailMemo()
+        self.index = self._open_index()
+        self.search = ManifestSearch(search_path) if search_path and os.path.exists(search_path) else None
+        self._pins = 0
+        self._retired = False
+        self._pin_lock = threading.Lock()
+
+    def _open_index(self) -> Optional[ManifestIndex]:
+        """Maps the compact manifest index, if one was built for this version."""
+        if not os.path.exists(self.index_path):
+            return None
+        try:
+            return ManifestIndex(self.index_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Error opening manifest index, using SQLite only: %s", e)
+            return None
+
+    def acquire(self) -> None:
+        """Registers a decode pinned to this version."""
+        with self._pin_lock:
+            self._pins += 1
+
+    def release(self) -> None:
+        with self._pin_lock:
+            self._pins -= 1
+            close = self._retired and self._pins == 0
+        if close:
+            self._close_index()
+
+    def retire(self) -> None:
+        """Marks this version as replaced: its index is unmapped once no decode is pinned to it."""
+        with self._pin_lock:
+            self._retired = True
+            close = self._pins == 0
+        if close:
+            self._close_index()
+
+    def _close_index(self) -> None:
+        # Lookups racing with the close see an index that covers nothing and use SQLite
+        index, self.index = self.index, None
+        if index is not None:
+            index.close()
+
+    def estimated_memory(self) -> int:
+        """Approximate bytes held by this version: the mapped index plus cached definitions and item details."""
+        index_bytes = 0
+        if self.index is not None:
+            try:
+                index_bytes = os.path.getsize(self.index_path)
+            except OSError:
+                pass
+        definitions = sum(table['size'] for table in self.cache.stats()['tables'].values())
+        return (index_bytes + definitions * self.DEFINITION_BYTES
+                + self.item_details.stats()['size'] * self.ITEM_DETAIL_BYTES)
 
 
 class ManifestDecoder:
@@ -16,40 +309,406 @@ class ManifestDecoder:
     # Rarity constants
     RARITY_EXOTIC = 6
 
-    def __init__(self):
+    # Small tables loaded fully in memory instead of going through the LRU
+    PRELOADED_TABLES = (
+        "DestinyStatDefinition",
+        "DestinyDamageTypeDefinition",
+        "DestinySocketTypeDefinition",
+    )
+
+    # Maximum number of bound parameters per "WHERE id IN (...)" query
+    BATCH_SIZE = 500
+
+    # Read-only connection tuning
+    MMAP_SIZE = 512 * 1024 * 1024
+    CACHED_STATEMENTS = 128
+
+    def __init__(self, locale: str = DEFAULT_LOCALE):
         current_dir = os.path.dirname(__file__)
-        self.db_path = os.path.join(current_dir, "manifest", "manifest.sqlite")
+        self.locale = locale
+        self.manifest_dir = os.path.join(current_dir, "manifest")
+        self.info_path = os.path.join(self.manifest_dir, "manifest_info.json")
+        self._local = threading.local()
+        self._state = self._load_state(generation=0)
+
+    # === Manifest Versions ===
+
+    def _read_info(self) -> Dict[str, Any]:
+        try:
+            with open(self.info_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _version_dir(self, info: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Version path and directory of this decoder's locale in manifest_info.json:
+        the top level for the default locale, the 'locales' map for the others.
+        """
+        if self.locale == DEFAULT_LOCALE:
+            # Manifests installed before versioned directories live in manifest/ itself
+            return info.get('version_path', ''), os.path.join(self.manifest_dir, info.get('version_dir', '.'))
+        entry = info.get('locales', {}).get(self.locale)
+        if not entry:
+            # Not installed yet: a directory that holds no database
+            return '', os.path.join(self.manifest_dir, "locales", self.locale)
+        return entry.get('version_path', ''), os.path.join(self.manifest_dir, entry['version_dir'])
+
+    def _load_state(self, generation: int) -> ManifestState:
+        """Resolves the installed manifest version from manifest_info.json."""
+        version, version_dir = self._version_dir(self._read_info())
+        return ManifestState(
+            version=version,
+            directory=version_dir,
+            db_path=os.path.join(version_dir, "manifest.sqlite"),
+            index_path=os.path.join(version_dir, "manifest.index"),
+            search_path=os.path.join(version_dir, "search.sqlite"),
+            generation=generation
+        )
+
+    @property
+    def state(self) -> ManifestState:
+        """The version used by this thread: the pinned one during a decode, else the current one."""
+        return getattr(self._local, 'pinned', None) or self._state
+
+    @property
+    def manifest_version(self) -> str:
+        return self._state.version
+
+    @property
+    def db_path(self) -> str:
+        return self._state.db_path
+
+    @property
+    def cache(self) -> DefinitionCache:
+        return self.state.cache
+
+    @property
+    def index(self) -> Optional[ManifestIndex]:
+        return self.state.index
+
+    @contextmanager
+    def pinned_version(self):
+        """
+        Keeps every lookup made by this thread on the same manifest version,
+        so a decode that started before a hot swap finishes on the old one.
+        """
+        if getattr(self._local, 'pinned', None) is not None:
+            yield self._local.pinned
+            return
+        state = self._local.pinned = self._state
+        state.acquire()
+        try:
+            yield state
+        finally:
+            self._local.pinned = None
+            state.release()
 
     def connect_db(self) -> sqlite3.Connection:
-        """Connects to the manifest database."""
-        if not os.path.exists(self.db_path):
-            raise FileNotFoundError(f"Database not found: {self.db_path}")
-        return sqlite3.connect(self.db_path)
+        """
+        Returns this thread's long-lived read-only connection to the manifest.
+
+        The database is opened in immutable mode with a large mmap window, and
+        each connection keeps its prepared statements in the sqlite3 statement
+        cache. A connection to another manifest version is closed and replaced
+        on its next use.
+        """
+        state = self.state
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            if self._local.conn_key == (state.db_path, state.generation):
+                return conn
+            conn.close()
+            self._local.conn = None
+
+        if not os.path.exists(state.db_path):
+            raise FileNotFoundError(f"Database not found: {state.db_path}")
+
+        uri = f"{Path(state.db_path).resolve().as_uri()}?mode=ro&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, cached_statements=self.CACHED_STATEMENTS)
+        conn.execute(f"PRAGMA mmap_size = {self.MMAP_SIZE}")
+
+        self._local.conn = conn
+        self._local.conn_key = (state.db_path, state.generation)
+        return conn
+
+    @staticmethod
+    def _select_by_id_sql(table_name: str) -> str:
+        """Builds the per-table lookup statement (kept identical so it stays prepared)."""
+        return f"SELECT json FROM {table_name} WHERE id = ?"
 
     def get_definition(self, table_name: str, hash_id: int) -> Optional[Dict[str, Any]]:
-        """Retrieves a definition from the manifest."""
+        """
+        Retrieves a full definition from the manifest.
+
+        Tables covered by the compact index are read from SQLite, since the
+        index only keeps the fields the decoder uses; the others go through
+        the cache.
+        """
+        return self._get_definition(table_name, hash_id, projected=False)
+
+    def _lookup_definition(self, table_name: str, hash_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves a definition as the decoder reads it, going through the
+        cache: for tables covered by the compact index, only the fields of
+        INDEXED_FIELDS are kept.
+        """
+        return self._get_definition(table_name, hash_id, projected=True)
+
+    def _get_definition(self, table_name: str, hash_id: int, projected: bool) -> Optional[Dict[str, Any]]:
+        try:
+            # Convert string to int if needed
+            if isinstance(hash_id, str):
+                hash_id = int(hash_id)
+        except ValueError as e:
+            logger.error("Error retrieving definition: %s", e)
+            return None
+
+        state = self.state
+        index = state.index
+        indexed = index is not None and index.covers(table_name)
+        # The cache of an indexed table holds projections, never returned as full definitions
+        cached = projected or not indexed
+        if cached:
+            found, definition = state.cache.get(table_name, hash_id)
+            if found:
+                self._record_lookups(table_name, "cache", 1)
+                return definition
+
+        started = time.perf_counter()
+        try:
+            if projected and indexed:
+                definition = index.get(table_name, hash_id)
+                state.cache.put(table_name, hash_id, definition)
+                self._record_lookups(table_name, "index", 1, time.perf_counter() - started)
+                return definition
+
+            conn = self.connect_db()
+
+            # Convert hash_id for SQLite database which contains
+            # negative IDs for values greater than 2^31-1
+            row_id = hash_id - 4294967296 if hash_id > 2147483647 else hash_id
+
+            result = conn.execute(self._select_by_id_sql(table_name), (row_id,)).fetchone()
+            definition = json.loads(result[0]) if result else None
+
+        except (sqlite3.Error, json.JSONDecodeError, ValueError, FileNotFoundError) as e:
+            logger.error("Error retrieving definition: %s", e)
+            self._record_lookups(table_name, "error", 1, time.perf_counter() - started)
+            return None
+
+        if cached:
+            state.cache.put(table_name, hash_id, definition)
+        self._record_lookups(table_name, "sqlite", 1, time.perf_counter() - started)
+        return definition
+
+    @staticmethod
+    def _record_lookups(table_name: str, source: str, count: int, seconds: Optional[float] = None) -> None:
+        """Feeds /metrics and the request's Server-Timing (seconds is None for cache hits)."""
+        manifest_lookups.inc(count, table=table_name, source=source)
+        if seconds is not None:
+            manifest_lookup_duration.observe(seconds / count, table=table_name)
+        record_lookups(count, seconds or 0.0)
+
+    def get_definitions(self, table_name: str, hash_ids) -> Dict[int, Dict[str, Any]]:
+        """
+        Retrieves many full definitions of one table at once.
+
+        Cached hashes are served from memory and the rest are fetched with
+        one "WHERE id IN (...)" query per BATCH_SIZE hashes. Like
+        get_definition, tables covered by the compact index are read from
+        SQLite.
+
+        Returns:
+            Dict mapping each found hash to its definition
+        """
+        return self._get_definitions(table_name, hash_ids, projected=False)
+
+    def _lookup_definitions(self, table_name: str, hash_ids) -> Dict[int, Dict[str, Any]]:
+        """Bulk _lookup_definition: projections for tables covered by the compact index."""
+        return self._get_definitions(table_name, hash_ids, projected=True)
+
+    def _get_definitions(self, table_name: str, hash_ids, projected: bool) -> Dict[int, Dict[str, Any]]:
+        state = self.state
+        index = state.index
+        indexed = index is not None and index.covers(table_name)
+        cached = projected or not indexed
+        definitions = {}
+        requested = {int(h) for h in hash_ids if h}
+        if not cached:
+            missing = list(requested)
+        else:
+            missing = []
+            for hash_id in requested:
+                found, definition = state.cache.get(table_name, hash_id)
+                if not found:
+                    missing.append(hash_id)
+                elif definition is not None:
+                    definitions[hash_id] = definition
+
+        if len(missing) < len(requested):
+            self._record_lookups(table_name, "cache", len(requested) - len(missing))
+        if not missing:
+            return definitions
+
+        started = time.perf_counter()
+        if projected and indexed:
+            for hash_id in missing:
+                definition = index.get(table_name, hash_id)
+                state.cache.put(table_name, hash_id, definition)
+                if definition is not None:
+                    definitions[hash_id] = definition
+            self._record_lookups(table_name, "index", len(missing), time.perf_counter() - started)
+            return definitions
+
+        try:
+            conn = self.connect_db()
+            for start in range(0, len(missing), self.BATCH_SIZE):
+                batch = missing[start:start + self.BATCH_SIZE]
+                row_ids = [h - 4294967296 if h > 2147483647 else h for h in batch]
+                placeholders = ",".join("?" * len(row_ids))
+                rows = conn.execute(
+                    f"SELECT id, json FROM {table_name} WHERE id IN ({placeholders})", row_ids
+                ).fetchall()
+
+                fetched = {row_id & 0xFFFFFFFF: json.loads(raw) for row_id, raw in rows}
+                for hash_id in batch:
+                    definition = fetched.get(hash_id)
+                    if cached:
+                        state.cache.put(table_name, hash_id, definition)
+                    if definition is not None:
+                        definitions[hash_id] = definition
+
+        except (sqlite3.Error, json.JSONDecodeError, ValueError, FileNotFoundError) as e:
+            logger.error("Error retrieving definitions: %s", e)
+            self._record_lookups(table_name, "error", len(missing), time.perf_counter() - started)
+            return definitions
+
+        self._record_lookups(table_name, "sqlite", len(missing), time.perf_counter() - started)
+        return definitions
+
+    # === Cache Management ===
+
+    def preload_small_tables(self) -> None:
+        """Loads the small, hot definition tables fully into memory."""
+        state = self.state
+        for table_name in self.PRELOADED_TABLES:
+            if state.cache.is_pinned(table_name):
+                continue
+            try:
+                rows = self.connect_db().execute(f"SELECT id, json FROM {table_name}").fetchall()
+            except (sqlite3.Error, FileNotFoundError) as e:
+                logger.error("Error preloading %s: %s", table_name, e)
+                continue
+
+            # Stored IDs are signed 32-bit, cache keys are the unsigned hashes
+            definitions = {row_id & 0xFFFFFFFF: json.loads(raw) for row_id, raw in rows}
+            state.cache.pin_table(table_name, definitions)
+
+    def reload(self) -> None:
+        """
+        Switches to the manifest version recorded in manifest_info.json.
+
+        The new version gets its own index mapping and definition cache, and
+        is prepared before it becomes current: new lookups use it while
+        decodes pinned to the previous version finish on it. When the new
+        version was diffed against the current one, cached definitions of
+        unchanged rows are carried over instead of being dropped.
+        """
+        old_state = self._state
+        new_state = self._load_state(generation=old_state.generation + 1)
+
+        diff = read_manifest_diff(new_state.directory)
+        if diff is not None and diff.get('old_version') == old_state.version and diff.get('new_version') == new_state.version:
+            new_state.cache.carry_over(old_state.cache, invalidated_hashes(diff))
+        previously_pinned = getattr(self._local, 'pinned', None)
+        self._local.pinned = new_state
         try:
-            with self.connect_db() as conn:
-                cursor = conn.cursor()
+            self.preload_small_tables()
+        finally:
+            self._local.pinned = previously_pinned
+        self._state = new_state
+        old_state.retire()
+
+    def is_ready(self) -> bool:
+        """True when a manifest database is installed and its small tables were loaded from it."""
+        state = self._state
+        return os.path.exists(state.db_path) and all(
+            state.cache.is_pinned(table_name) for table_name in self.PRELOADED_TABLES
+        )
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads when manifest_info.json points to another version than the
+        one in use, e.g. after another worker installed or rolled back a
+        manifest. Returns whether a reload happened.
+        """
+        version, version_dir = self._version_dir(self._read_info())
+        state = self._state
+        if version == state.version and version_dir == state.directory:
+            return False
+        self.reload()
+        return True
 
-                # Convert string to int if needed
-                if isinstance(hash_id, str):
-                    hash_id = int(hash_id)
+    def cache_stats(self) -> Dict[str, Any]:
+        """Returns definition cache and item detail memo counters for the current manifest version."""
+        return {
+            'manifest_version': self.manifest_version,
+            **self._state.cache.stats(),
+            'item_details': self._state.item_details.stats()
+        }
 
-                # Convert hash_id for SQLite database which contains
-                # negative IDs for values greater than 2^31-1
-                if hash_id > 2147483647:
-                    hash_id = hash_id - 4294967296
+    # === Item Search ===
 
-                cursor.execute(f"SELECT json FROM {table_name} WHERE id = ?", (hash_id,))
-                result = cursor.fetchone()
+    def search_items(self, query: str, rarity: Optional[str] = None, class_name: Optional[str] = None,
+                     item_type: Optional[str] = None, page: int = 1, page_size: int = 20) -> Optional[Dict[str, Any]]:
+        """
+        Full-text search over item names, descriptions and flavour text.
 
-                return json.loads(result[0]) if result else None
+        rarity and class_name take the names returned by get_rarity_name and
+        get_class_name (a class also matches items usable by all classes);
+        item_type takes a DestinyItemType name such as 'weapon' or its value.
+        Returns None when no search index was built for the current version.
 
-        except (sqlite3.Error, json.JSONDecodeError, ValueError) as e:
-            print(f"Error retrieving definition: {e}")
+        Raises:
+            ValueError: if a filter value is unknown
+        """
+        search = self.state.search
+        if search is None:
             return None
 
+        tier_type = None
+        if rarity:
+            tier_type = next((tier for tier in range(7) if self.get_rarity_name(tier).lower() == rarity.lower()), None)
+            if tier_type is None:
+                raise ValueError(f"Unknown rarity: {rarity}")
+
+        class_types = None
+        if class_name:
+            class_type = next((value for value in (self.CLASS_TITAN, self.CLASS_HUNTER, self.CLASS_WARLOCK)
+                               if self.get_class_name(value).lower() == class_name.lower()), None)
+            if class_type is None:
+                raise ValueError(f"Unknown class: {class_name}")
+            class_types = (class_type, self.CLASS_ALL)
+
+        item_type_value = None
+        if item_type:
+            item_type_value = int(item_type) if item_type.isdigit() else ITEM_TYPES.get(item_type.lower())
+            if item_type_value is None:
+                raise ValueError(f"Unknown item type: {item_type}")
+
+        total, rows = search.search(query, item_type_value, tier_type, class_types,
+                                    offset=(page - 1) * page_size, limit=page_size)
+        for row in rows:
+            row['rarity'] = self.get_rarity_name(row.pop('tierType') or 0)
+        return {
+            'query': query,
+            'page': page,
+            'pageSize': page_size,
+            'total': total,
+            'results': rows
+        }
+
     # === Definition Getters ===
 
     def get_item_definition(self, item_hash: int) -> Optional[Dict[str, Any]]:
@@ -86,9 +745,45 @@ class ManifestDecoder:
             stats_data: Stats data (optional)
             
         Returns:
-            Dict with all detailed item information
+            Read-only (FrozenDict) detailed information, shared between
+            identical items of the same manifest version
+        """
+        with self.pinned_version() as state:
+            key = ItemDetailMemo.make_key(state.version, item_hash, item_instance_data, sockets_data, stats_data)
+            found, detailed_info = state.item_details.get(key)
+            if found:
+                return detailed_info
+
+            detailed_info = self._build_item_detailed_info(item_hash, item_instance_data, sockets_data, stats_data)
+            detailed_info = freeze(detailed_info) if detailed_info is not None else None
+            state.item_details.put(key, detailed_info)
+            return detailed_info
+
+    def get_items_detailed_info(self, item_hashes: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """
+        Detailed information (without instance data) for many items, all from
+        the same manifest version. Item definitions and the plugs, stats and
+        damage types they reference are resolved with bulk queries first;
+        items already memoized skip both. The details are the memoized,
+        read-only records (see get_item_detailed_info).
         """
-        item_def = self.get_item_definition(item_hash)
+        item_hashes = list(item_hashes)
+        with self.pinned_version() as state:
+            pending = [
+                item_hash for item_hash in item_hashes
+                if ItemDetailMemo.make_key(state.version, item_hash, None, None, None) not in state.item_details
+            ]
+            if pending:
+                item_defs = self._lookup_definitions("DestinyInventoryItemDefinition", pending)
+                plug_hashes, stat_hashes, damage_type_hashes = self._referenced_hashes(item_defs.values())
+                self._lookup_definitions("DestinyInventoryItemDefinition", plug_hashes)
+                self._lookup_definitions("DestinyStatDefinition", stat_hashes)
+                self._lookup_definitions("DestinyDamageTypeDefinition", damage_type_hashes)
+            return {item_hash: self.get_item_detailed_info(item_hash) for item_hash in item_hashes}
+
+    def _build_item_detailed_info(self, item_hash: int, item_instance_data: Optional[Dict],
+                                  sockets_data: Optional[Dict], stats_data: Optional[Dict]) -> Optional[Dict[str, Any]]:
+        item_def = self._lookup_definition("DestinyInventoryItemDefinition", item_hash)
         if not item_def:
             return None
 
@@ -132,7 +827,7 @@ class ManifestDecoder:
         if not damage_type_hash:
             return
 
-        damage_type_def = self.get_damage_type_definition(damage_type_hash)
+        damage_type_def = self._lookup_definition("DestinyDamageTypeDefinition", damage_type_hash)
         if damage_type_def:
             detailed_info['damageType'] = {
                 'hash': damage_type_hash,
@@ -145,7 +840,7 @@ class ManifestDecoder:
         """Add base item stats from definition."""
         stats_data = item_def.get('stats', {}).get('stats', {})
         for stat_hash, stat_value in stats_data.items():
-            stat_def = self.get_stat_definition(int(stat_hash))
+            stat_def = self._lookup_definition("DestinyStatDefinition", int(stat_hash))
             if stat_def:
                 detailed_info['stats'][stat_hash] = {
                     'hash': stat_hash,
@@ -160,7 +855,7 @@ class ManifestDecoder:
         """Add investment stats (for power level notably)."""
         investment_stats = item_def.get('investmentStats', [])
         for stat in investment_stats:
-            stat_def = self.get_stat_definition(stat.get('statTypeHash'))
+            stat_def = self._lookup_definition("DestinyStatDefinition", stat.get('statTypeHash'))
             if stat_def:
                 detailed_info['investmentStats'].append({
                     'hash': stat.get('statTypeHash'),
@@ -181,7 +876,7 @@ class ManifestDecoder:
             return
 
         for stat_hash, stat_value in stats_data['stats'].items():
-            stat_def = self.get_stat_definition(int(stat_hash))
+            stat_def = self._lookup_definition("DestinyStatDefinition", int(stat_hash))
             if stat_def:
                 detailed_info['stats'][stat_hash] = {
                     'hash': stat_hash,
@@ -223,7 +918,7 @@ class ManifestDecoder:
 
     def _create_plug_info(self, plug_hash: int) -> Optional[Dict[str, Any]]:
         """Create plug information dictionary."""
-        plug_def = self.get_plug_definition(plug_hash)
+        plug_def = self._lookup_definition("DestinyInventoryItemDefinition", plug_hash)
         if not plug_def:
             return None
 
@@ -254,21 +949,91 @@ class ManifestDecoder:
 
     # === Vendor Data Processing ===
 
-    def decode_vendor_data(self, vendor_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Decodes vendor data by adding readable names."""
+    def decode_vendor_data(self, vendor_data: Dict[str, Any],
+                           vendor_hashes: Optional[Iterable] = None) -> Dict[str, Any]:
+        """
+        Decodes vendor data by adding readable names.
+
+        Args:
+            vendor_data: /Destiny2/Vendors/ response
+            vendor_hashes: Only decode (and keep) these vendors; all vendors when None
+        """
         if not vendor_data or 'Response' not in vendor_data:
             return vendor_data
 
         response = vendor_data['Response']
-        self._decode_vendors(response)
-        self._decode_sales(response)
+        if vendor_hashes is not None:
+            self._select_vendors(response, {str(vendor_hash) for vendor_hash in vendor_hashes})
+
+        with self.pinned_version(), timed("decode"), profile_phase("decode_vendor_data"):
+            self._prefetch_definitions(response)
+            self._decode_vendors(response)
+            self._decode_sales(response)
         return vendor_data
 
+    async def decode_vendor_data_async(self, vendor_data: Dict[str, Any],
+                                       vendor_hashes: Optional[Iterable] = None) -> Dict[str, Any]:
+        """Runs decode_vendor_data in the decode thread pool, off the event loop."""
+        return await decode_pool.run(self.decode_vendor_data, vendor_data, vendor_hashes)
+
+    def _select_vendors(self, response: Dict[str, Any], vendor_hashes: Set[str]) -> None:
+        """Drops the vendors (and their sales) that were not requested, before any decoding."""
+        for component in ('vendors', 'sales'):
+            component_data = response.get(component, {}).get('data')
+            if component_data is not None:
+                response[component]['data'] = {
+                    vendor_hash: data for vendor_hash, data in component_data.items()
+                    if vendor_hash in vendor_hashes
+                }
+
+    def _prefetch_definitions(self, response: Dict[str, Any]) -> None:
+        """
+        Resolves every hash referenced by the vendor payload with bulk queries.
+
+        Items are fetched first, since their definitions reference the plugs,
+        stats and damage types. The decode steps then hit the cache only.
+        """
+        vendor_hashes = set(response.get('vendors', {}).get('data', {}).keys())
+        self._lookup_definitions("DestinyVendorDefinition", vendor_hashes)
+
+        item_hashes = set()
+        instance_keys = set()
+        for vendor_sales in response.get('sales', {}).get('data', {}).values():
+            for sale_item in vendor_sales.get('saleItems', {}).values():
+                item_hashes.add(sale_item.get('itemHash'))
+                instance_keys.add(str(sale_item.get('vendorItemIndex', 0)))
+        item_defs = self._lookup_definitions("DestinyInventoryItemDefinition", item_hashes)
+        plug_hashes, stat_hashes, damage_type_hashes = self._referenced_hashes(item_defs.values())
+
+        for instance_key in instance_keys:
+            sockets_data = self._get_response_data(response, 'itemSockets', instance_key) or {}
+            plug_hashes.update(socket.get('plugHash') for socket in sockets_data.get('sockets', []))
+            stats_data = self._get_response_data(response, 'itemStats', instance_key) or {}
+            stat_hashes.update(stats_data.get('stats', {}).keys())
+
+        self._lookup_definitions("DestinyInventoryItemDefinition", plug_hashes)
+        self._lookup_definitions("DestinyStatDefinition", stat_hashes)
+        self._lookup_definitions("DestinyDamageTypeDefinition", damage_type_hashes)
+
+    @staticmethod
+    def _referenced_hashes(item_defs: Iterable[Dict[str, Any]]) -> Tuple[set, set, set]:
+        """Default plug, stat and damage type hashes referenced by item definitions."""
+        plug_hashes = set()
+        stat_hashes = set()
+        damage_type_hashes = set()
+        for item_def in item_defs:
+            damage_type_hashes.add(item_def.get('defaultDamageTypeHash'))
+            stat_hashes.update(item_def.get('stats', {}).get('stats', {}).keys())
+            stat_hashes.update(stat.get('statTypeHash') for stat in item_def.get('investmentStats', []))
+            for socket_entry in item_def.get('sockets', {}).get('socketEntries', []):
+                plug_hashes.add(socket_entry.get('singleInitialItemHash'))
+        return plug_hashes, stat_hashes, damage_type_hashes
+
     def _decode_vendors(self, response: Dict[str, Any]) -> None:
         """Decode vendor information."""
         vendors_data = response.get('vendors', {}).get('data', {})
         for vendor_hash, vendor_info in vendors_data.items():
-            vendor_def = self.get_definition("DestinyVendorDefinition", int(vendor_hash))
+            vendor_def = self._lookup_definition("DestinyVendorDefinition", int(vendor_hash))
             if vendor_def and 'displayProperties' in vendor_def:
                 vendor_info['name'] = vendor_def['displayProperties'].get('name', 'Unknown vendor')
                 vendor_info['description'] = vendor_def['displayProperties'].get('description', '')
@@ -300,7 +1065,7 @@ class ManifestDecoder:
         if not item_hash:
             return True
 
-        item_def = self.get_item_definition(item_hash)
+        item_def = self._lookup_definition("DestinyInventoryItemDefinition", item_hash)
         if not item_def or 'displayProperties' not in item_def:
             return True
 
@@ -342,7 +1107,7 @@ class ManifestDecoder:
             })
         else:
             # Fallback to basic information
-            item_def = self.get_item_definition(item_hash)
+            item_def = self._lookup_definition("DestinyInventoryItemDefinition", item_hash)
             if item_def:
                 sale_item.update({
                     'itemName': item_def['displayProperties'].get('name', ''),
@@ -421,4 +1186,105 @@ class ManifestDecoder:
 
         return any(link in name_lower for link in navigation_links)
 
+class LocaleDecoders:
+    """
+    One ManifestDecoder per locale, created on first use. When the estimated
+    memory of the loaded locales exceeds the budget, the least recently used
+    ones are dropped; the default locale and the one just requested are
+    always kept.
+    """
+
+    def __init__(self, default_decoder: ManifestDecoder, memory_budget: int):
+        self.default = default_decoder
+        self.memory_budget = memory_budget
+        self.evictions = 0
+        self._decoders: OrderedDict = OrderedDict({default_decoder.locale: default_decoder})
+        self._lock = threading.Lock()
+
+    def get(self, locale: str) -> ManifestDecoder:
+        """Returns the decoder of a locale, loading it if needed."""
+        with self._lock:
+            decoder = self._decoders.get(locale)
+            created = decoder is None
+            if created:
+                decoder = ManifestDecoder(locale)
+                self._decoders[locale] = decoder
+            self._decoders.move_to_end(locale)
+
+        if created and os.path.exists(decoder.db_path):
+            decoder.preload_small_tables()
+        self._enforce_budget(keep=locale)
+        return decoder
+
+    async def get_async(self, locale: str) -> ManifestDecoder:
+        """get() for the event loop: a decoder that is not loaded yet is created and preloaded in a thread."""
+        with self._lock:
+            loaded = locale in self._decoders
+        if loaded:
+            return self.get(locale)
+        return await asyncio.to_thread(self.get, locale)
+
+    def loaded(self) -> Dict[str, ManifestDecoder]:
+        """Decoders currently in memory, least recently used first."""
+        with self._lock:
+            return dict(self._decoders)
+
+    def current_version(self, locale: str) -> Optional[str]:
+        """Manifest version served for a locale, or None if its decoder is not loaded."""
+        with self._lock:
+            decoder = self._decoders.get(locale)
+        return decoder.manifest_version if decoder is not None else None
+
+    def reload_if_changed(self) -> List[str]:
+        """Reloads every loaded locale whose version changed. Returns the reloaded locales."""
+        return [locale for locale, decoder in self.loaded().items() if decoder.reload_if_changed()]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Estimated bytes per loaded locale."""
+        return {locale: decoder._state.estimated_memory() for locale, decoder in self.loaded().items()}
+
+    def _enforce_budget(self, keep: str) -> None:
+        """Unloads least recently used locales (get() order) until the budget is met, sparing keep."""
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        if total <= self.memory_budget:
+            return
+        evicted = []
+        with self._lock:
+            for locale in list(self._decoders):
+                if total <= self.memory_budget:
+                    break
+                if locale in (self.default.locale, keep) or locale not in usage:
+                    continue
+                evicted.append(self._decoders.pop(locale))
+                total -= usage[locale]
+                self.evictions += 1
+                logger.info("Unloaded manifest locale %s (memory budget of %d bytes exceeded)",
+                            locale, self.memory_budget)
+        for decoder in evicted:
+            # Decodes pinned to its state finish on it; the index is unmapped after the last of them
+            decoder._state.retire()
+
+    def stats(self) -> Dict[str, Any]:
+        """Loaded locales with their version, readiness and estimated memory."""
+        usage = self.memory_usage()
+        return {
+            'memory_budget': self.memory_budget,
+            'estimated_memory': sum(usage.values()),
+            'evictions': self.evictions,
+            'loaded': {
+                locale: {
+                    'version': decoder.manifest_version,
+                    'ready': decoder.is_ready(),
+                    'estimated_memory': usage.get(locale, 0)
+                }
+                for locale, decoder in self.loaded().items()
+            }
+        }
+
+
+# Memory budget shared by the loaded locales (indexes and caches, not SQLite's page mmap)
+MANIFEST_MEMORY_BUDGET = int(os.getenv("MANIFEST_MEMORY_BUDGET_MB", "512")) * 1024 * 1024
+
 manifest_decoder = ManifestDecoder()
+manifest_decoders = LocaleDecoders(manifest_decoder, MANIFEST_MEMORY_BUDGET)
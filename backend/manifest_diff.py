@@ -0,0 +1,124 @@
+"""
+Table-by-table diff between two manifest versions.
+
+Rows are compared through a content hash of their JSON, walking both
+databases in hash order, so memory use does not depend on manifest size.
+The diff lists the definition hashes added, changed or removed per table;
+it drives the incremental index rebuild and the cache carry-over between
+versions.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_DIFF_NAME = "manifest_diff.json"
+
+
+def _open_readonly(db_path: Path) -> sqlite3.Connection:
+    return sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def _tables(conn: sqlite3.Connection) -> set:
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _row_digests(conn: sqlite3.Connection, table_name: str) -> Iterator[Tuple[int, bytes]]:
+    """Yields (unsigned hash, content hash) for every row, in hash order."""
+    rows = conn.execute(f"SELECT id & 4294967295 AS hash, json FROM {table_name} ORDER BY hash")
+    for hash_id, raw in rows:
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        yield hash_id, hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def _diff_table(old_conn: sqlite3.Connection, new_conn: sqlite3.Connection, table_name: str) -> Dict[str, list]:
+    """Merge-joins both tables on the definition hash."""
+    added, changed, removed = [], [], []
+    old_rows = _row_digests(old_conn, table_name)
+    new_rows = _row_digests(new_conn, table_name)
+    old_row = next(old_rows, None)
+    new_row = next(new_rows, None)
+
+    while old_row is not None or new_row is not None:
+        if new_row is None or (old_row is not None and old_row[0] < new_row[0]):
+            removed.append(old_row[0])
+            old_row = next(old_rows, None)
+        elif old_row is None or new_row[0] < old_row[0]:
+            added.append(new_row[0])
+            new_row = next(new_rows, None)
+        else:
+            if old_row[1] != new_row[1]:
+                changed.append(new_row[0])
+            old_row = next(old_rows, None)
+            new_row = next(new_rows, None)
+
+    return {'added': added, 'changed': changed, 'removed': removed}
+
+
+def diff_manifests(old_db: Path, new_db: Path, old_version: str, new_version: str) -> Dict[str, Any]:
+    """
+    Compares every table of two manifest databases.
+
+    Tables only present in the new manifest have all their rows added, and
+    tables that disappeared have all their rows removed.
+    """
+    old_conn = _open_readonly(old_db)
+    new_conn = _open_readonly(new_db)
+    try:
+        old_tables = _tables(old_conn)
+        new_tables = _tables(new_conn)
+        tables = {}
+        for table_name in sorted(old_tables | new_tables):
+            if table_name not in old_tables:
+                hashes = [hash_id for hash_id, _ in _row_digests(new_conn, table_name)]
+                tables[table_name] = {'added': hashes, 'changed': [], 'removed': []}
+            elif table_name not in new_tables:
+                hashes = [hash_id for hash_id, _ in _row_digests(old_conn, table_name)]
+                tables[table_name] = {'added': [], 'changed': [], 'removed': hashes}
+            else:
+                tables[table_name] = _diff_table(old_conn, new_conn, table_name)
+    finally:
+        old_conn.close()
+        new_conn.close()
+
+    summary = {
+        table_name: {kind: len(hashes) for kind, hashes in table_diff.items()}
+        for table_name, table_diff in tables.items()
+        if any(table_diff.values())
+    }
+    logger.info("🔀 Diff du manifest: %d tables modifiées sur %d", len(summary), len(tables))
+    return {
+        'old_version': old_version,
+        'new_version': new_version,
+        'created_at': datetime.now().isoformat(),
+        'summary': summary,
+        'tables': {table_name: table_diff for table_name, table_diff in tables.items() if any(table_diff.values())}
+    }
+
+
+def write_manifest_diff(diff: Dict[str, Any], version_directory: Path) -> None:
+    with open(Path(version_directory) / MANIFEST_DIFF_NAME, 'w', encoding='utf-8') as f:
+        json.dump(diff, f)
+
+
+def read_manifest_diff(version_directory: Path) -> Optional[Dict[str, Any]]:
+    """Reads the diff stored with an installed version, if any."""
+    try:
+        with open(Path(version_directory) / MANIFEST_DIFF_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def invalidated_hashes(diff: Dict[str, Any]) -> Dict[str, set]:
+    """Hashes whose cached definition (or cached absence) is stale, per table."""
+    return {
+        table_name: set(table_diff['added']) | set(table_diff['changed']) | set(table_diff['removed'])
+        for table_name, table_diff in diff.get('tables', {}).items()
+    }
@@ -0,0 +1,249 @@
+"""
+Compact, memory-mapped index of the manifest definitions used by the decoder.
+
+The index is derived from manifest.sqlite after each update. It keeps only
+the tables and fields that ManifestDecoder reads. For each table, it stores a
+sorted uint32 hash array, a uint32 offset array and a packed blob of compact
+JSON rows. Lookups binary-search the mmapped hash array, so every uvicorn
+worker shares the same page cache instead of parsing full JSON blobs.
+
+File layout (little-endian):
+    header     MAGIC, FORMAT_VERSION, table count
+    directory  per table: name, row count, hashes/offsets/blob positions
+    sections   hashes (uint32 * n), offsets (uint32 * (n + 1)), blob
+"""
+import json
+import logging
+import mmap
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LMIX"
+# Bump when INDEXED_FIELDS changes, so previous indexes are not reused
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sII")
+_TABLE_ENTRY = struct.Struct("<IQQQQ")
+
+_DISPLAY = {'name': True, 'description': True, 'icon': True}
+
+# Fields read by ManifestDecoder, per table (True keeps the whole value)
+INDEXED_FIELDS: Dict[str, Dict[str, Any]] = {
+    "DestinyInventoryItemDefinition": {
+        'displayProperties': _DISPLAY,
+        'itemType': True,
+        'itemSubType': True,
+        'classType': True,
+        'inventory': {'tierType': True},
+        'flavorText': True,
+        'equippingBlock': {'ammoType': True},
+        'defaultDamageTypeHash': True,
+        'stats': {'stats': True},
+        'investmentStats': {'statTypeHash': True, 'value': True},
+        'sockets': {'socketEntries': {'singleInitialItemHash': True}},
+    },
+    "DestinyStatDefinition": {
+        'displayProperties': _DISPLAY,
+    },
+    "DestinyDamageTypeDefinition": {
+        'displayProperties': _DISPLAY,
+        'color': True,
+    },
+    "DestinyVendorDefinition": {
+        'displayProperties': _DISPLAY,
+    },
+}
+
+
+def _project(value: Any, spec: Any) -> Any:
+    """Keeps only the fields of value described by spec."""
+    if spec is True:
+        return value
+    if isinstance(value, list):
+        return [_project(entry, spec) for entry in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub_spec) for key, sub_spec in spec.items() if key in value}
+    return value
+
+
+def _projected_rows(conn: sqlite3.Connection, table_name: str, spec: Dict[str, Any]):
+    """Yields (unsigned hash, projected JSON bytes) in hash order."""
+    # Order by the unsigned hash, which is what lookups search for
+    rows = conn.execute(f"SELECT id & 4294967295 AS hash, json FROM {table_name} ORDER BY hash")
+    for hash_id, raw in rows:
+        yield hash_id, json.dumps(_project(json.loads(raw), spec), separators=(',', ':')).encode('utf-8')
+
+
+def _incremental_rows(conn: sqlite3.Connection, table_name: str, spec: Dict[str, Any],
+                      previous_table: "_IndexedTable", stale: set):
+    """Like _projected_rows, reusing the previous index for rows not in stale."""
+    hash_ids = conn.execute(f"SELECT id & 4294967295 AS hash FROM {table_name} ORDER BY hash")
+    for (hash_id,) in hash_ids:
+        data = None if hash_id in stale else previous_table.raw(hash_id)
+        if data is None:
+            row_id = hash_id - 4294967296 if hash_id > 2147483647 else hash_id
+            (raw,) = conn.execute(f"SELECT json FROM {table_name} WHERE id = ?", (row_id,)).fetchone()
+            data = json.dumps(_project(json.loads(raw), spec), separators=(',', ':')).encode('utf-8')
+        yield hash_id, data
+
+
+def build_manifest_index(db_path: Path, index_path: Path, previous_index_path: Optional[Path] = None,
+                         stale_hashes: Optional[Dict[str, set]] = None) -> None:
+    """
+    Builds the compact index for db_path and atomically installs it at index_path.
+
+    Rows are streamed in hash order into one spool file per table, so memory
+    use stays bounded by the hash and offset arrays. When the index of the
+    previous version and the hashes that changed since (see manifest_diff)
+    are given, unchanged rows are copied from the previous index and only
+    the stale ones are parsed again.
+    """
+    index_path = Path(index_path)
+    sections = []
+
+    previous_index = None
+    if previous_index_path is not None and stale_hashes is not None and Path(previous_index_path).exists():
+        try:
+            previous_index = ManifestIndex(previous_index_path)
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Index précédent inutilisable, reconstruction complète: %s", e)
+
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        for table_name, spec in INDEXED_FIELDS.items():
+            if table_name not in existing:
+                logger.warning("⚠️ Table %s absente du manifest, ignorée dans l'index", table_name)
+                continue
+
+            hashes = array('I')
+            offsets = array('I', [0])
+            blob = tempfile.TemporaryFile(dir=index_path.parent)
+
+            if previous_index is not None and previous_index.covers(table_name):
+                rows = _incremental_rows(conn, table_name, spec, previous_index.tables[table_name],
+                                         stale_hashes.get(table_name, set()))
+            else:
+                rows = _projected_rows(conn, table_name, spec)
+
+            for hash_id, data in rows:
+                blob.write(data)
+                hashes.append(hash_id)
+                offsets.append(offsets[-1] + len(data))
+
+            sections.append((table_name, hashes, offsets, blob))
+    finally:
+        conn.close()
+        if previous_index is not None:
+            previous_index.close()
+
+    tmp_path = index_path.with_suffix(index_path.suffix + ".tmp")
+    try:
+        with open(tmp_path, 'wb') as out:
+            names = [name.encode('utf-8') for name, _, _, _ in sections]
+            directory_size = sum(2 + len(name) + _TABLE_ENTRY.size for name in names)
+            position = _HEADER.size + directory_size
+
+            out.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections)))
+            for name, (_, hashes, offsets, blob) in zip(names, sections):
+                hashes_at = position
+                offsets_at = hashes_at + 4 * len(hashes)
+                blob_at = offsets_at + 4 * len(offsets)
+                out.write(struct.pack("<H", len(name)) + name)
+                out.write(_TABLE_ENTRY.pack(len(hashes), hashes_at, offsets_at, blob_at, offsets[-1]))
+                position = blob_at + offsets[-1]
+
+            for _, hashes, offsets, blob in sections:
+                if sys.byteorder != 'little':
+                    hashes.byteswap()
+                    offsets.byteswap()
+                hashes.tofile(out)
+                offsets.tofile(out)
+                blob.seek(0)
+                shutil.copyfileobj(blob, out)
+
+        os.replace(tmp_path, index_path)
+    finally:
+        for _, _, _, blob in sections:
+            blob.close()
+        if tmp_path.exists():
+            os.remove(tmp_path)
+
+    logger.info("✅ Index compact du manifest généré: %s (%d bytes)", index_path, os.path.getsize(index_path))
+
+
+class _IndexedTable:
+    """One table of the index: views over the mmapped sections."""
+
+    def __init__(self, buffer: memoryview, count: int, hashes_at: int, offsets_at: int, blob_at: int, blob_size: int):
+        self.hashes = buffer[hashes_at:hashes_at + 4 * count].cast('I')
+        self.offsets = buffer[offsets_at:offsets_at + 4 * (count + 1)].cast('I')
+        self.blob = buffer[blob_at:blob_at + blob_size]
+
+    def raw(self, hash_id: int) -> Optional[bytes]:
+        """Returns the stored JSON bytes of a row."""
+        position = bisect_left(self.hashes, hash_id)
+        if position == len(self.hashes) or self.hashes[position] != hash_id:
+            return None
+        return self.blob[self.offsets[position]:self.offsets[position + 1]].tobytes()
+
+    def get(self, hash_id: int) -> Optional[Dict[str, Any]]:
+        data = self.raw(hash_id)
+        return json.loads(data) if data is not None else None
+
+    def release(self) -> None:
+        self.hashes.release()
+        self.offsets.release()
+        self.blob.release()
+
+
+class ManifestIndex:
+    """Read-only, memory-mapped view of a file written by build_manifest_index."""
+
+    def __init__(self, index_path: Path):
+        if sys.byteorder != 'little':
+            raise ValueError("Manifest index requires a little-endian host")
+
+        with open(index_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self._buffer = memoryview(self._mmap)
+
+        magic, version, table_count = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported manifest index: {index_path}")
+
+        self.tables: Dict[str, _IndexedTable] = {}
+        position = _HEADER.size
+        for _ in range(table_count):
+            (name_length,) = struct.unpack_from("<H", buffer, position)
+            name = buffer[position + 2:position + 2 + name_length].tobytes().decode('utf-8')
+            position += 2 + name_length
+            self.tables[name] = _IndexedTable(buffer, *_TABLE_ENTRY.unpack_from(buffer, position))
+            position += _TABLE_ENTRY.size
+
+    def close(self) -> None:
+        """Releases the views and unmaps the file; the index covers no table afterwards."""
+        tables, self.tables = self.tables, {}
+        for table in tables.values():
+            table.release()
+        self._buffer.release()
+        self._mmap.close()
+
+    def covers(self, table_name: str) -> bool:
+        """Tells whether table_name is stored in the index."""
+        return table_name in self.tables
+
+    def get(self, table_name: str, hash_id: int) -> Optional[Dict[str, Any]]:
+        """Looks up one definition (unsigned hash) in an indexed table."""
+        return self.tables[table_name].get(hash_id)
@@ -0,0 +1,90 @@
+"""
+Coordination of the manifest updater between uvicorn worker processes.
+
+Every worker shares the backend/manifest volume. One of them holds the
+leader lock and alone checks for and installs new manifests; the others
+follow manifest_info.json and reload when it changes. The lock is an
+fcntl advisory lock, released by the OS when its holder dies, so a
+follower takes over on its next attempt.
+
+Installs (update or rollback) additionally take the install lock, so a
+forced update on a follower cannot run while the leader installs.
+"""
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows: a single worker is assumed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ManifestBusyError(RuntimeError):
+    """Raised when another worker is already installing a manifest."""
+
+
+def _try_lock(path: Path) -> Optional[int]:
+    """Takes an exclusive lock on path without waiting. Returns the fd, or None if held elsewhere."""
+    if fcntl is None:
+        return -1
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None and fd >= 0:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class ManifestLeader:
+    """Leader election through a lock file held for the life of the process."""
+
+    def __init__(self, lock_path: Path):
+        self.lock_path = lock_path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Becomes leader if no other worker is. Returns whether this worker is leader."""
+        if self._fd is None:
+            self._fd = _try_lock(self.lock_path)
+            if self._fd is not None:
+                logger.info("👑 Worker %d est le leader des mises à jour du manifest", os.getpid())
+        return self.is_leader
+
+    def release(self) -> None:
+        if self._fd is not None:
+            _unlock(self._fd)
+            self._fd = None
+
+
+@contextmanager
+def install_lock(lock_path: Path):
+    """
+    Held while a manifest version is installed or rolled back.
+
+    Raises:
+        ManifestBusyError: if another worker holds it
+    """
+    fd = _try_lock(lock_path)
+    if fd is None:
+        raise ManifestBusyError("Une mise à jour du manifest est déjà en cours dans un autre worker")
+    try:
+        yield
+    finally:
+        _unlock(fd)
@@ -1,14 +1,26 @@
 import asyncio
 import json
 import os
+import shutil
+import sqlite3
 import zipfile
 import logging
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 import httpx
 from dotenv import load_dotenv
 
+from .locales import (
+    DEFAULT_LOCALE, MANIFEST_LOCALES, is_installable_locale, negotiate_locale
+)
+from .manifest_decoder import manifest_decoder, manifest_decoders
+from .manifest_diff import diff_manifests, invalidated_hashes, read_manifest_diff, write_manifest_diff
+from .manifest_index import ManifestIndex, build_manifest_index
+from .manifest_leader import ManifestBusyError, ManifestLeader, install_lock
+from .manifest_search import build_search_index, is_search_index_current
+
 load_dotenv()
 
 # Configuration du logging
@@ -18,10 +30,38 @@ BUNGIE_API_KEY = os.getenv("BUNGIE_API_KEY")
 BUNGIE_API_URL = "https://www.bungie.net/Platform"
 
 MANIFEST_DIRECTORY = Path(__file__).parent / "manifest"
-MANIFEST_DB_FILE = MANIFEST_DIRECTORY / "manifest.sqlite"
 MANIFEST_INFO_FILE = MANIFEST_DIRECTORY / "manifest_info.json"
+MANIFEST_VERSIONS_DIRECTORY = MANIFEST_DIRECTORY / "versions"
+MANIFEST_DB_NAME = "manifest.sqlite"
+MANIFEST_INDEX_NAME = "manifest.index"
+MANIFEST_SEARCH_NAME = "search.sqlite"
 MANIFEST_DIRECTORY.mkdir(exist_ok=True)
 
+# Inter-process locks shared by the uvicorn workers
+MANIFEST_LEADER_LOCK = MANIFEST_DIRECTORY / ".leader.lock"
+MANIFEST_INSTALL_LOCK = MANIFEST_DIRECTORY / ".install.lock"
+manifest_leader = ManifestLeader(MANIFEST_LEADER_LOCK)
+
+# Tables a manifest must contain before being installed
+REQUIRED_TABLES = (
+    "DestinyInventoryItemDefinition",
+    "DestinyStatDefinition",
+    "DestinyDamageTypeDefinition",
+    "DestinySocketTypeDefinition",
+    "DestinyVendorDefinition",
+)
+
+# Only one download/install at a time
+_update_lock = asyncio.Lock()
+
+# On-demand locale installs in progress, by locale
+_locale_installs: dict = {}
+
+# Streaming download settings
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_PROGRESS_STEP = 20 * 1024 * 1024
+DOWNLOAD_MAX_ATTEMPTS = 3
+
 async def get_manifest_metadata():
     """
     Fetches the metadata for the Destiny 2 Manifest from the Bungie API.
@@ -50,47 +90,116 @@ async def get_manifest_metadata():
         logger.error(error_msg, exc)
         return None
 
+async def _download_to_file(url: str, part_path: Path) -> int:
+    """
+    Streams url to part_path in chunks, resuming an existing partial file
+    with an HTTP Range request. Returns the expected total size.
+    """
+    for attempt in range(1, DOWNLOAD_MAX_ATTEMPTS + 1):
+        downloaded = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={downloaded}-"} if downloaded else {}
+
+        try:
+            async with httpx.AsyncClient(timeout=360.0) as client:
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 416:
+                        # The partial file is already complete (or invalid): start over
+                        part_path.unlink()
+                        continue
+                    response.raise_for_status()
+
+                    if response.status_code == 206:
+                        total_size = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+                        mode = 'ab'
+                        logger.info("⏯️ Reprise du téléchargement à %d bytes", downloaded)
+                    else:
+                        total_size = int(response.headers.get("Content-Length", 0))
+                        downloaded = 0
+                        mode = 'wb'
+
+                    next_log = downloaded + DOWNLOAD_PROGRESS_STEP
+                    with open(part_path, mode) as f:
+                        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                            downloaded += len(chunk)
+                            if downloaded >= next_log:
+                                logger.info("📥 %d / %d bytes téléchargés", downloaded, total_size)
+                                next_log += DOWNLOAD_PROGRESS_STEP
+
+            return total_size
+
+        except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as exc:
+            if attempt == DOWNLOAD_MAX_ATTEMPTS:
+                raise
+            logger.warning("⚠️ Téléchargement interrompu (%s), nouvelle tentative %d/%d...",
+                           exc, attempt + 1, DOWNLOAD_MAX_ATTEMPTS)
+
+    raise httpx.RequestError(f"Impossible de télécharger {url}")
+
+
+def _extract_content_file(zip_path: Path, dest_path: Path) -> None:
+    """Stream-extracts the .content entry to a temporary file, checks its size and swaps it in."""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        # Find the .content file name inside the zip archive
+        content_info = next(
+            (info for info in zip_ref.infolist() if info.filename.endswith('.content')),
+            None
+        )
+        if not content_info:
+            raise FileNotFoundError("Impossible de trouver le fichier .content dans l'archive zip du manifest.")
+
+        tmp_path = dest_path.with_suffix(dest_path.suffix + ".tmp")
+        try:
+            with zip_ref.open(content_info) as source, open(tmp_path, 'wb') as target:
+                shutil.copyfileobj(source, target, DOWNLOAD_CHUNK_SIZE)
+
+            extracted_size = tmp_path.stat().st_size
+            if extracted_size != content_info.file_size:
+                raise zipfile.BadZipFile(
+                    f"Taille extraite inattendue: {extracted_size} au lieu de {content_info.file_size}"
+                )
+            os.replace(tmp_path, dest_path)
+        finally:
+            if tmp_path.exists():
+                os.remove(tmp_path)
+
+
 async def download_and_unzip_manifest(url: str, dest_path: Path):
     """
-    Downloads a file from a URL, unzips it, finds the .content file,
-    and renames it to our standard database name.
+    Downloads the manifest zip to disk in chunks (resuming a partial download
+    if any), extracts its .content file and swaps it in as our standard
+    database name once its size has been verified.
     """
     logger.info("📥 Téléchargement du manifest depuis: https://www.bungie.net%s", url)
+    part_path = dest_path.parent / "manifest.zip.part"
+    zip_path = dest_path.parent / "manifest.zip"
     try:
-        async with httpx.AsyncClient(timeout=360.0) as client:
-            response = await client.get(f"https://www.bungie.net{url}")
-            response.raise_for_status()
+        total_size = await _download_to_file(f"https://www.bungie.net{url}", part_path)
 
-        zip_path = MANIFEST_DIRECTORY / "manifest.zip"
-        zip_path.write_bytes(response.content)
-        logger.info("✅ Téléchargement terminé (%d bytes). Extraction en cours...", len(response.content))
+        downloaded_size = part_path.stat().st_size
+        if total_size and downloaded_size != total_size:
+            part_path.unlink()
+            raise zipfile.BadZipFile(f"Téléchargement incomplet: {downloaded_size} / {total_size} bytes")
 
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            # Find the .content file name inside the zip archive
-            content_filename = next(
-                (name for name in zip_ref.namelist() if name.endswith('.content')),
-                None
-            )
-            if not content_filename:
-                raise FileNotFoundError("Impossible de trouver le fichier .content dans l'archive zip du manifest.")
+        os.replace(part_path, zip_path)
+        logger.info("✅ Téléchargement terminé (%d bytes). Extraction en cours...", downloaded_size)
 
-            zip_ref.extract(content_filename, path=MANIFEST_DIRECTORY)
-
-            extracted_file = MANIFEST_DIRECTORY / content_filename
-            if dest_path.exists():
-                os.remove(dest_path)
-            extracted_file.rename(dest_path)
+        await asyncio.to_thread(_extract_content_file, zip_path, dest_path)
 
         os.remove(zip_path)
         logger.info("✅ Manifest extrait avec succès vers: %s", dest_path)
 
-    except httpx.RequestError as exc:
+    except httpx.HTTPError as exc:
         error_msg = "❌ Échec du téléchargement du manifest: %s"
         logger.error(error_msg, exc)
         raise
     except zipfile.BadZipFile as e:
         error_msg = "❌ Erreur lors de l'extraction (fichier zip corrompu): %s"
         logger.error(error_msg, e)
+        # Do not resume from a corrupted archive
+        for path in (part_path, zip_path):
+            if path.exists():
+                os.remove(path)
         raise
     except FileNotFoundError as e:
         error_msg = "❌ Erreur (fichier non trouvé): %s"
@@ -98,10 +207,123 @@ async def download_and_unzip_manifest(url: str, dest_path: Path):
         raise
 
 
+def read_manifest_info() -> dict:
+    """Reads manifest_info.json, the pointer to the installed manifest version."""
+    if not MANIFEST_INFO_FILE.exists():
+        return {}
+    with open(MANIFEST_INFO_FILE, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            logger.warning("⚠️ Impossible de lire le fichier d'informations du manifest. Mise à jour forcée.")
+            return {}
+
+
+def _write_manifest_info(manifest_info: dict) -> None:
+    """Atomically replaces manifest_info.json (the version pointer flip)."""
+    tmp_path = MANIFEST_INFO_FILE.with_suffix(".json.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest_info, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, MANIFEST_INFO_FILE)
+
+
+def manifest_version_directory(version_dir: str) -> Path:
+    """Directory of an installed version ('.' is the pre-versioning layout)."""
+    return MANIFEST_DIRECTORY / version_dir
+
+
+def current_manifest_db_file() -> Path:
+    """Path of the manifest database currently in use."""
+    return manifest_version_directory(read_manifest_info().get('version_dir', '.')) / MANIFEST_DB_NAME
+
+
+def _version_dir_name(version_path: str) -> str:
+    """Directory name for a Bungie manifest path such as /common/.../world_sql_content_<hash>.content"""
+    return f"versions/{Path(version_path).stem}"
+
+
+async def _build_search_index(directory: Path) -> None:
+    """Builds the item search index of a version; search stays disabled if SQLite lacks FTS5."""
+    logger.info("🔎 Génération de l'index de recherche...")
+    try:
+        await asyncio.to_thread(build_search_index, directory / MANIFEST_DB_NAME, directory / MANIFEST_SEARCH_NAME)
+    except sqlite3.OperationalError as e:
+        logger.error("❌ Index de recherche non généré, recherche désactivée: %s", e)
+
+
+def validate_manifest(db_path: Path, index_path: Path) -> None:
+    """
+    Checks a freshly installed manifest before it becomes current: the
+    expected tables are present and sample lookups succeed in both the
+    SQLite database and the compact index.
+    """
+    index = ManifestIndex(index_path)
+    conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [table for table in REQUIRED_TABLES if table not in existing]
+        if missing:
+            raise ValueError(f"Tables manquantes dans le manifest: {', '.join(missing)}")
+
+        for table_name in REQUIRED_TABLES:
+            row = conn.execute(f"SELECT id, json FROM {table_name} LIMIT 1").fetchone()
+            if row is None:
+                raise ValueError(f"Table vide dans le manifest: {table_name}")
+            definition = json.loads(row[1])
+            if index.covers(table_name) and index.get(table_name, row[0] & 0xFFFFFFFF) is None:
+                raise ValueError(f"Définition {row[0]} absente de l'index pour {table_name}")
+            if not isinstance(definition, dict):
+                raise ValueError(f"Définition invalide dans {table_name}")
+    finally:
+        conn.close()
+        index.close()
+
+
+def _installed_version_dirs(info: dict) -> set:
+    """
+    Version directories referenced by manifest_info.json: current and
+    previous, of the default locale and of the others.
+    """
+    keep = {info.get('version_dir', '.')}
+    if info.get('previous'):
+        keep.add(info['previous']['version_dir'])
+    for entry in info.get('locales', {}).values():
+        keep.add(entry['version_dir'])
+        if entry.get('previous'):
+            keep.add(entry['previous']['version_dir'])
+    return keep
+
+
+def _prune_versions(keep: set) -> None:
+    """Removes installed versions other than the current and previous ones."""
+    if not MANIFEST_VERSIONS_DIRECTORY.exists():
+        return
+    for version_directory in MANIFEST_VERSIONS_DIRECTORY.iterdir():
+        if f"versions/{version_directory.name}" not in keep:
+            logger.info("🧹 Suppression de l'ancienne version du manifest: %s", version_directory.name)
+            shutil.rmtree(version_directory, ignore_errors=True)
+
+
 async def update_manifest_if_needed():
     """
     Checks if the local manifest is outdated and updates it if necessary.
+
+    A new version is downloaded into its own directory, indexed and
+    validated, then made current by atomically rewriting manifest_info.json.
+    The previous version is kept for rollback. Skipped when another worker
+    is already installing a manifest.
     """
+    async with _update_lock:
+        try:
+            with install_lock(MANIFEST_INSTALL_LOCK):
+                await _update_manifest_if_needed()
+        except ManifestBusyError as e:
+            logger.warning("⏳ %s", e)
+
+
+async def _update_manifest_if_needed():
     logger.info("🔍 Vérification des mises à jour du manifest...")
     metadata = await get_manifest_metadata()
     if not metadata:
@@ -109,38 +331,299 @@ async def update_manifest_if_needed():
         return
 
     try:
-        new_manifest_path = metadata['Response']['mobileWorldContentPaths']['en']
+        content_paths = metadata['Response']['mobileWorldContentPaths']
+        new_manifest_path = content_paths[DEFAULT_LOCALE]
         logger.info("📋 Version disponible: %s", new_manifest_path)
     except KeyError:
         logger.error("❌ Impossible de trouver le chemin du manifest anglais dans la réponse API")
         return
 
-    current_manifest_version = ""
-    if MANIFEST_INFO_FILE.exists():
-        with open(MANIFEST_INFO_FILE, 'r', encoding='utf-8') as f:
-            try:
-                info = json.load(f)
-                current_manifest_version = info.get('version_path', '')
-                logger.info("📋 Version locale: %s", current_manifest_version)
-            except json.JSONDecodeError:
-                logger.warning("⚠️ Impossible de lire le fichier d'informations du manifest. Mise à jour forcée.")
-
-    if new_manifest_path == current_manifest_version and MANIFEST_DB_FILE.exists():
+    await _update_default_locale(new_manifest_path)
+
+    # Les autres langues configurées ou installées à la demande suivent la même version
+    installed = set(read_manifest_info().get('locales', {}))
+    await _uninstall_locales({locale for locale in installed if not is_installable_locale(locale)})
+    locales = (set(MANIFEST_LOCALES) | installed) - {DEFAULT_LOCALE}
+    for locale in sorted(locales):
+        if is_installable_locale(locale) and locale in content_paths:
+            await _update_locale(locale, content_paths[locale])
+
+    _prune_versions(_installed_version_dirs(read_manifest_info()))
+    logger.info("✅ Processus de mise à jour du manifest terminé")
+
+
+async def _update_default_locale(new_manifest_path: str) -> None:
+    info = read_manifest_info()
+    current_manifest_version = info.get('version_path', '')
+    current_directory = manifest_version_directory(info.get('version_dir', '.'))
+    if current_manifest_version:
+        logger.info("📋 Version locale: %s", current_manifest_version)
+
+    if new_manifest_path == info.get('blocked_version') and new_manifest_path != current_manifest_version:
+        logger.warning("⛔ Version %s bloquée après un retour arrière, mise à jour ignorée", new_manifest_path)
+        return
+
+    if new_manifest_path == current_manifest_version and (current_directory / MANIFEST_DB_NAME).exists():
         logger.info("✅ Le manifest est déjà à jour")
-    else:
-        logger.info("🔄 Nouvelle version détectée. Mise à jour en cours...")
-        await download_and_unzip_manifest(new_manifest_path, MANIFEST_DB_FILE)
-
-        # Sauvegarder les informations avec timestamp
-        manifest_info = {
-            'version_path': new_manifest_path,
-            'last_update': datetime.now().isoformat(),
-            'file_size': os.path.getsize(MANIFEST_DB_FILE) if MANIFEST_DB_FILE.exists() else 0
+        if not (current_directory / MANIFEST_INDEX_NAME).exists():
+            logger.info("🗂️ Index compact absent, génération...")
+            await asyncio.to_thread(build_manifest_index, current_directory / MANIFEST_DB_NAME,
+                                    current_directory / MANIFEST_INDEX_NAME)
+            await asyncio.to_thread(manifest_decoder.reload)
+        if not is_search_index_current(current_directory / MANIFEST_SEARCH_NAME):
+            await _build_search_index(current_directory)
+            await asyncio.to_thread(manifest_decoder.reload)
+        return
+
+    logger.info("🔄 Nouvelle version détectée. Mise à jour en cours...")
+    version_dir = _version_dir_name(new_manifest_path)
+    new_directory = manifest_version_directory(version_dir)
+    new_directory.mkdir(parents=True, exist_ok=True)
+    db_file = new_directory / MANIFEST_DB_NAME
+    index_file = new_directory / MANIFEST_INDEX_NAME
+
+    await download_and_unzip_manifest(new_manifest_path, db_file)
+
+    # Comparer avec la version actuelle pour ne reconstruire que les lignes modifiées
+    previous_db = current_directory / MANIFEST_DB_NAME
+    stale_hashes = None
+    if current_manifest_version and previous_db.exists():
+        logger.info("🔀 Comparaison avec la version actuelle...")
+        diff = await asyncio.to_thread(diff_manifests, previous_db, db_file,
+                                       current_manifest_version, new_manifest_path)
+        write_manifest_diff(diff, new_directory)
+        stale_hashes = invalidated_hashes(diff)
+
+    logger.info("🗂️ Génération de l'index compact du manifest...")
+    await asyncio.to_thread(build_manifest_index, db_file, index_file,
+                            current_directory / MANIFEST_INDEX_NAME, stale_hashes)
+    await _build_search_index(new_directory)
+
+    await _validate_or_discard(db_file, index_file, new_directory)
+
+    # Sauvegarder les informations avec timestamp, puis basculer
+    previous_version = None
+    if info.get('version_path') and (current_directory / MANIFEST_DB_NAME).exists():
+        previous_version = {
+            'version_path': info['version_path'],
+            'version_dir': info.get('version_dir', '.'),
+            'last_update': info.get('last_update')
+        }
+    manifest_info = {
+        'version_path': new_manifest_path,
+        'version_dir': version_dir,
+        'last_update': datetime.now().isoformat(),
+        'file_size': os.path.getsize(db_file),
+        'previous': previous_version,
+        'locales': read_manifest_info().get('locales', {}),
+        'blocked_version': info.get('blocked_version')
+    }
+    _write_manifest_info(manifest_info)
+
+    # Les nouvelles requêtes utilisent la nouvelle version, celles en cours finissent sur l'ancienne
+    # (le rechargement lit le manifest hors de la boucle d'événements)
+    await asyncio.to_thread(manifest_decoder.reload)
+
+
+async def _validate_or_discard(db_file: Path, index_file: Path, new_directory: Path) -> None:
+    """Validates a downloaded version, removing its directory if it is invalid."""
+    logger.info("🧪 Validation de la nouvelle version...")
+    try:
+        await asyncio.to_thread(validate_manifest, db_file, index_file)
+    except (sqlite3.Error, ValueError) as e:
+        logger.error("❌ Manifest invalide, la version actuelle est conservée: %s", e)
+        shutil.rmtree(new_directory, ignore_errors=True)
+        raise
+
+
+async def _uninstall_locales(locales: set) -> None:
+    """
+    Removes locales that are no longer configured from manifest_info.json;
+    their directories go with the next prune.
+    """
+    if not locales:
+        return
+    info = read_manifest_info()
+    for locale in sorted(locales):
+        info.get('locales', {}).pop(locale, None)
+        logger.info("🗑️ Manifest '%s' retiré (langue non configurée)", locale)
+    _write_manifest_info(info)
+    await asyncio.to_thread(manifest_decoders.reload_if_changed)
+
+
+async def _update_locale(locale: str, new_manifest_path: str) -> None:
+    """
+    Installs the manifest of a locale other than the default one. Its entry
+    in the 'locales' map of manifest_info.json is replaced; the version it
+    replaces is kept as 'previous' until the next install, so workers that
+    have not reloaded yet and decodes pinned to it finish on it. Diff and
+    rollback only cover the default locale.
+    """
+    entry = read_manifest_info().get('locales', {}).get(locale, {})
+    if entry.get('version_path') == new_manifest_path and \
+            (manifest_version_directory(entry['version_dir']) / MANIFEST_DB_NAME).exists():
+        current_directory = manifest_version_directory(entry['version_dir'])
+        if not is_search_index_current(current_directory / MANIFEST_SEARCH_NAME):
+            await _build_search_index(current_directory)
+            if locale in manifest_decoders.loaded():
+                await asyncio.to_thread(manifest_decoders.get(locale).reload)
+        return
+
+    logger.info("🌐 Installation du manifest '%s': %s", locale, new_manifest_path)
+    version_dir = f"{_version_dir_name(new_manifest_path)}-{locale}"
+    new_directory = manifest_version_directory(version_dir)
+    new_directory.mkdir(parents=True, exist_ok=True)
+    db_file = new_directory / MANIFEST_DB_NAME
+    index_file = new_directory / MANIFEST_INDEX_NAME
+
+    await download_and_unzip_manifest(new_manifest_path, db_file)
+    await asyncio.to_thread(build_manifest_index, db_file, index_file)
+    await _build_search_index(new_directory)
+    await _validate_or_discard(db_file, index_file, new_directory)
+
+    previous_version = None
+    if entry.get('version_path') and (manifest_version_directory(entry['version_dir']) / MANIFEST_DB_NAME).exists():
+        previous_version = {
+            'version_path': entry['version_path'],
+            'version_dir': entry['version_dir'],
+            'last_update': entry.get('last_update')
         }
-        
-        with open(MANIFEST_INFO_FILE, 'w', encoding='utf-8') as f:
-            json.dump(manifest_info, f, indent=2)
-        logger.info("✅ Processus de mise à jour du manifest terminé")
+    info = read_manifest_info()
+    info.setdefault('locales', {})[locale] = {
+        'version_path': new_manifest_path,
+        'version_dir': version_dir,
+        'last_update': datetime.now().isoformat(),
+        'file_size': os.path.getsize(db_file),
+        'previous': previous_version
+    }
+    _write_manifest_info(info)
+    await asyncio.to_thread(manifest_decoders.reload_if_changed)
+    logger.info("✅ Manifest '%s' installé", locale)
+
+
+def is_locale_installed(locale: str) -> bool:
+    """Whether the manifest of a locale is installed on disk."""
+    if locale == DEFAULT_LOCALE:
+        return current_manifest_db_file().exists()
+    entry = read_manifest_info().get('locales', {}).get(locale)
+    return bool(entry) and (manifest_version_directory(entry['version_dir']) / MANIFEST_DB_NAME).exists()
+
+
+def ensure_locale_manifest(locale: str) -> bool:
+    """
+    Starts installing the manifest of a locale in the background if it is
+    configured (MANIFEST_LOCALES or MANIFEST_ON_DEMAND_LOCALES) and not
+    installed yet. Returns whether an install is running.
+    """
+    if not is_installable_locale(locale) or is_locale_installed(locale):
+        return False
+    task = _locale_installs.get(locale)
+    if task is None or task.done():
+        _locale_installs[locale] = asyncio.create_task(_install_locale_on_demand(locale))
+    return True
+
+
+async def served_locale(lang: Optional[str], accept_language: Optional[str]) -> str:
+    """
+    The locale requested by ?lang= or Accept-Language if its manifest is
+    installed, else the default locale. The decoder of an installed locale
+    is loaded in a thread, off the event loop. A configured locale that is
+    not installed yet is installed in the background meanwhile; other
+    locales are always served in the default locale.
+    """
+    locale = negotiate_locale(lang, accept_language)
+    if locale == DEFAULT_LOCALE or not is_installable_locale(locale):
+        return DEFAULT_LOCALE
+    decoder = manifest_decoders.loaded().get(locale)
+    if decoder is None and is_locale_installed(locale):
+        decoder = await manifest_decoders.get_async(locale)
+    if decoder is not None and decoder.is_ready():
+        return locale
+    if ensure_locale_manifest(locale):
+        logger.info("🌐 Manifest '%s' en cours d'installation, '%s' servi en attendant", locale, DEFAULT_LOCALE)
+    return DEFAULT_LOCALE
+
+
+async def _install_locale_on_demand(locale: str) -> None:
+    async with _update_lock:
+        try:
+            with install_lock(MANIFEST_INSTALL_LOCK):
+                metadata = await get_manifest_metadata()
+                content_path = (metadata or {}).get('Response', {}).get('mobileWorldContentPaths', {}).get(locale)
+                if not content_path:
+                    logger.error("❌ Aucun manifest '%s' dans les métadonnées", locale)
+                    return
+                await _update_locale(locale, content_path)
+        except ManifestBusyError as e:
+            logger.warning("⏳ %s", e)
+        except (httpx.HTTPError, zipfile.BadZipFile, FileNotFoundError, sqlite3.Error, ValueError) as e:
+            logger.error("❌ Échec de l'installation du manifest '%s': %s", locale, e)
+
+
+def current_manifest_diff() -> dict:
+    """Diff between the current manifest version and the one it replaced, if recorded."""
+    info = read_manifest_info()
+    return read_manifest_diff(manifest_version_directory(info.get('version_dir', '.')))
+
+
+async def rollback_manifest() -> dict:
+    """
+    Makes the previous manifest version current again (and the current one previous).
+
+    The version rolled back from is recorded as blocked_version: update
+    checks do not install it again until clear_blocked_version() is called.
+
+    Raises:
+        FileNotFoundError: if no previous version is installed
+        ManifestBusyError: if another worker is installing a manifest
+    """
+    async with _update_lock:
+        with install_lock(MANIFEST_INSTALL_LOCK):
+            info = read_manifest_info()
+            previous_version = info.get('previous')
+            if not previous_version:
+                raise FileNotFoundError("Aucune version précédente du manifest disponible")
+
+            previous_db = manifest_version_directory(previous_version['version_dir']) / MANIFEST_DB_NAME
+            if not previous_db.exists():
+                raise FileNotFoundError(f"Version précédente introuvable: {previous_db}")
+
+            manifest_info = {
+                'version_path': previous_version['version_path'],
+                'version_dir': previous_version['version_dir'],
+                'last_update': datetime.now().isoformat(),
+                'file_size': os.path.getsize(previous_db),
+                'previous': {
+                    'version_path': info['version_path'],
+                    'version_dir': info.get('version_dir', '.'),
+                    'last_update': info.get('last_update')
+                },
+                'locales': info.get('locales', {}),
+                'blocked_version': info['version_path']
+            }
+            _write_manifest_info(manifest_info)
+            await asyncio.to_thread(manifest_decoder.reload)
+            logger.info("⏪ Retour à la version du manifest: %s (%s bloquée)",
+                        manifest_info['version_path'], info['version_path'])
+            return manifest_info
+
+
+async def clear_blocked_version() -> Optional[str]:
+    """
+    Allows update checks to install the version blocked by a rollback again.
+    Returns the version that was blocked, if any.
+
+    Raises:
+        ManifestBusyError: if another worker is installing a manifest
+    """
+    async with _update_lock:
+        with install_lock(MANIFEST_INSTALL_LOCK):
+            info = read_manifest_info()
+            blocked_version = info.pop('blocked_version', None)
+            if blocked_version:
+                _write_manifest_info(info)
+                logger.info("🔓 Version du manifest débloquée: %s", blocked_version)
+            return blocked_version
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
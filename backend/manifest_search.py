@@ -0,0 +1,180 @@
+"""
+Full-text search over the manifest items.
+
+search.sqlite is derived from manifest.sqlite when a version is installed,
+next to the compact index. It holds a small `items` table with the fields
+used to filter and list results, indexed on item type, rarity and class,
+and a contentless FTS5 table over names, descriptions and flavour text
+whose rowids are the item hashes. A search is one MATCH query joined to
+`items` by primary key, so DestinyInventoryItemDefinition is never scanned.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the schema changes, so indexes of installed versions are rebuilt
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE items (
+    hash INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    icon TEXT,
+    item_type_name TEXT,
+    item_type INTEGER,
+    tier_type INTEGER,
+    class_type INTEGER
+);
+CREATE INDEX items_facets ON items (item_type, tier_type, class_type);
+CREATE VIRTUAL TABLE items_fts USING fts5(
+    name, description, flavor,
+    content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+"""
+
+# Column weights of bm25(): a match in the name counts most
+_RANK = "bm25(items_fts, 10.0, 2.0, 1.0)"
+
+# Words of a query beyond this are ignored
+MAX_QUERY_TOKENS = 8
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# DestinyItemType values accepted by name in the item_type filter
+ITEM_TYPES = {
+    "currency": 1, "armor": 2, "weapon": 3, "message": 7, "engram": 8, "consumable": 9,
+    "exchange_material": 10, "mission_data": 11, "quest_step": 12, "quest_step_complete": 13,
+    "emblem": 14, "quest": 15, "subclass": 16, "clan_banner": 17, "aura": 18, "mod": 19,
+    "dummy": 20, "ship": 21, "vehicle": 22, "emote": 23, "ghost": 24, "package": 25,
+    "bounty": 26, "wrapper": 27, "seasonal_artifact": 28, "finisher": 29, "pattern": 30,
+}
+
+
+def build_search_index(db_path: Path, search_path: Path) -> None:
+    """Builds the search database for db_path and atomically installs it at search_path."""
+    search_path = Path(search_path)
+    tmp_path = search_path.with_suffix(search_path.suffix + ".tmp")
+    if tmp_path.exists():
+        os.remove(tmp_path)
+
+    source = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    target = sqlite3.connect(tmp_path)
+    try:
+        target.executescript(_SCHEMA)
+        count = 0
+        with target:
+            for row_id, raw in source.execute("SELECT id, json FROM DestinyInventoryItemDefinition"):
+                item = json.loads(raw)
+                display = item.get('displayProperties', {})
+                name = (display.get('name') or '').strip()
+                if not name or item.get('redacted'):
+                    continue
+
+                item_hash = row_id & 0xFFFFFFFF
+                target.execute(
+                    "INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (item_hash, name, display.get('icon'), item.get('itemTypeDisplayName'),
+                     item.get('itemType'), item.get('inventory', {}).get('tierType'), item.get('classType'))
+                )
+                target.execute(
+                    "INSERT INTO items_fts (rowid, name, description, flavor) VALUES (?, ?, ?, ?)",
+                    (item_hash, name, display.get('description', ''), item.get('flavorText', ''))
+                )
+                count += 1
+        target.execute("INSERT INTO items_fts (items_fts) VALUES ('optimize')")
+        target.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        target.commit()
+    finally:
+        source.close()
+        target.close()
+
+    try:
+        os.replace(tmp_path, search_path)
+    finally:
+        if tmp_path.exists():
+            os.remove(tmp_path)
+    logger.info("🔎 Index de recherche généré: %s (%d objets)", search_path, count)
+
+
+def is_search_index_current(search_path: Path) -> bool:
+    """True when search_path exists and was built with the current schema."""
+    if not Path(search_path).exists():
+        return False
+    try:
+        conn = sqlite3.connect(f"{Path(search_path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+
+def match_expression(query: str) -> Optional[str]:
+    """
+    Turns free text into an FTS5 query: every word must match, as a prefix.
+    Returns None when the text holds no word.
+    """
+    tokens = _TOKEN.findall(query.lower())[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+class ManifestSearch:
+    """Read-only access to one version's search.sqlite, with one connection per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            uri = f"{Path(self.path).resolve().as_uri()}?mode=ro&immutable=1"
+            conn = self._local.conn = sqlite3.connect(uri, uri=True)
+        return conn
+
+    def search(self, query: str, item_type: Optional[int] = None, tier_type: Optional[int] = None,
+               class_types: Optional[Tuple[int, ...]] = None, offset: int = 0,
+               limit: int = 20) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Returns (total matches, one page of items) for a text query and filters:
+        an exact name first, then by relevance.
+        """
+        expression = match_expression(query)
+        if expression is None:
+            return 0, []
+
+        conditions = ["items_fts MATCH ?"]
+        params: List[Any] = [expression]
+        if item_type is not None:
+            conditions.append("items.item_type = ?")
+            params.append(item_type)
+        if tier_type is not None:
+            conditions.append("items.tier_type = ?")
+            params.append(tier_type)
+        if class_types:
+            conditions.append(f"items.class_type IN ({', '.join('?' * len(class_types))})")
+            params.extend(class_types)
+
+        where = " AND ".join(conditions)
+        joined = "FROM items_fts JOIN items ON items.hash = items_fts.rowid"
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) {joined} WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT items.hash, items.name, items.icon, items.item_type_name, items.item_type, "
+            f"items.tier_type, items.class_type {joined} WHERE {where} "
+            f"ORDER BY items.name = ? COLLATE NOCASE DESC, {_RANK}, items.hash LIMIT ? OFFSET ?",
+            params + [query.strip(), limit, offset]
+        ).fetchall()
+
+        columns = ('hash', 'name', 'icon', 'itemTypeDisplayName', 'itemType', 'tierType', 'classType')
+        return total, [dict(zip(columns, row)) for row in rows]
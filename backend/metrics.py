@@ -0,0 +1,230 @@
+"""
+In-process metrics exposed in the Prometheus text format on /metrics.
+
+Counters and histograms are plain lock-protected dicts keyed on label
+values, cheap enough for the decode hot path. Gauges either hold a value
+or are computed by a callback when /metrics is scraped; so are counters
+that mirror a tally kept elsewhere (e.g. cache hits and misses).
+"""
+import asyncio
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; upstream calls and routes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; single definition lookups (index hits are in the microseconds)
+LOOKUP_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+EVENT_LOOP_LAG_INTERVAL = 0.5
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    """
+    Monotonic counter with labels. When a callback is given, it is called at
+    scrape time and returns {label values tuple: value}.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        if self._callback is not None:
+            values = sorted((tuple(str(v) for v in key), value) for key, value in self._callback().items())
+        else:
+            with self._lock:
+                values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets, plus sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # One slot per bucket, then +Inf, sum
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted((key, list(series)) for key, series in self._values.items())
+        for key, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Gauge(_Metric):
+    """
+    Current value with labels. When a callback is given, it is called at
+    scrape time and returns {label values tuple: value}.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> Iterable[str]:
+        if self._callback is not None:
+            values = sorted((tuple(str(v) for v in key), value) for key, value in self._callback().items())
+        else:
+            with self._lock:
+                values = sorted(self._values.items())
+        for key, value in values:
+            if value is not None:
+                yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Registry:
+    """Holds every metric and renders them for a scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # A failing callback must not break the whole scrape
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# === Hot-path metrics ===
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "API request latency by route.", ("method", "route", "status"))
+
+bungie_requests = registry.counter(
+    "bungie_requests_total", "Requests sent to the Bungie API by endpoint and outcome.", ("endpoint", "outcome"))
+bungie_request_duration = registry.histogram(
+    "bungie_request_duration_seconds", "Latency of requests sent to the Bungie API.", ("endpoint",))
+bungie_error_codes = registry.counter(
+    "bungie_error_codes_total", "Bungie ErrorCode values other than Success (1).", ("endpoint", "error_code"))
+
+manifest_lookups = registry.counter(
+    "manifest_lookups_total", "Manifest definition lookups by table and source (cache, index, sqlite, error).",
+    ("table", "source"))
+manifest_lookup_duration = registry.histogram(
+    "manifest_lookup_duration_seconds", "Latency of definition lookups that missed the cache.",
+    ("table",), LOOKUP_BUCKETS)
+
+event_loop_lag = registry.gauge(
+    "event_loop_lag_seconds", "Delay of the last event loop lag probe past its scheduled time.")
+event_loop_lag_histogram = registry.histogram(
+    "event_loop_lag_probe_seconds", "Distribution of event loop lag probes.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+
+async def monitor_event_loop_lag(interval: float = EVENT_LOOP_LAG_INTERVAL) -> None:
+    """Measures how late the event loop wakes up a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        event_loop_lag.set(lag)
+        event_loop_lag_histogram.observe(lag)
@@ -0,0 +1,163 @@
+"""
+Opt-in call-tree profiling of the Xûr pipeline (upstream fetch and decode).
+
+A profile is attached to the current context; code paths wrapped with
+profile_phase() record a call tree while it is active (the decode pool
+propagates the context to its worker threads). Profiles are written as
+folded stacks ("a;b;c <microseconds>"), readable by flamegraph.pl,
+speedscope and inferno.
+
+On-demand profiling (/xur/?profile=1) needs the PROFILE_ADMIN_TOKEN sent
+in the X-Admin-Token header. Snapshot builds can also be sampled with
+PROFILE_SAMPLE_RATE (0 to 1).
+"""
+import contextvars
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_OUTPUT_DIR = Path(os.getenv("PROFILE_OUTPUT_DIR", Path(__file__).parent / "profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+_current_profile: contextvars.ContextVar[Optional['CallTreeProfile']] = contextvars.ContextVar(
+    "current_profile", default=None)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _c_label(function) -> str:
+    module = getattr(function, '__module__', None) or 'builtins'
+    return f"{module}.{getattr(function, '__qualname__', repr(function))}"
+
+
+class CallTreeProfile:
+    """Self time per call stack, accumulated from one or more profiled phases."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = datetime.now()
+        self._self_times: Dict[Tuple[str, ...], float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add(self, stack: Tuple[str, ...], seconds: float) -> None:
+        with self._lock:
+            self._self_times[stack] += seconds
+
+    @contextmanager
+    def capture(self, root: str):
+        """Records the call tree of the code run by this thread inside the block."""
+        # Each entry: [stack, start time, time spent in children]
+        frames: List[list] = [[(self.name, root), time.perf_counter(), 0.0]]
+
+        def hook(frame, event, arg):
+            now = time.perf_counter()
+            if event in ('call', 'c_call'):
+                label = _frame_label(frame) if event == 'call' else _c_label(arg)
+                frames.append([frames[-1][0] + (label,), now, 0.0])
+            elif event in ('return', 'c_return', 'c_exception') and len(frames) > 1:
+                stack, started, children = frames.pop()
+                elapsed = now - started
+                self.add(stack, elapsed - children)
+                frames[-1][2] += elapsed
+
+        previous = sys.getprofile()
+        sys.setprofile(hook)
+        try:
+            yield self
+        finally:
+            sys.setprofile(previous)
+            now = time.perf_counter()
+            # Close the frames still open when the block exited
+            while len(frames) > 1:
+                stack, started, children = frames.pop()
+                self.add(stack, now - started - children)
+                frames[-1][2] += now - started
+            stack, started, children = frames[0]
+            self.add(stack, now - started - children)
+
+    def total_seconds(self, root: Optional[str] = None) -> float:
+        with self._lock:
+            return sum(seconds for stack, seconds in self._self_times.items()
+                       if root is None or stack[1] == root)
+
+    def folded(self) -> str:
+        """Folded stacks with self time in microseconds, heaviest first."""
+        with self._lock:
+            items = sorted(self._self_times.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{';'.join(stack)} {int(seconds * 1_000_000)}\n"
+                       for stack, seconds in items if seconds > 0)
+
+    def save(self, directory: Path = PROFILE_OUTPUT_DIR) -> Path:
+        """Writes the folded stacks to disk, keeping the PROFILE_MAX_FILES newest profiles."""
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.started_at:%Y%m%d-%H%M%S-%f}-{self.name}.folded"
+        path.write_text(self.folded(), encoding='utf-8')
+
+        profiles = sorted(directory.glob("*.folded"))
+        for old_profile in profiles[:-PROFILE_MAX_FILES]:
+            old_profile.unlink(missing_ok=True)
+        return path
+
+
+@contextmanager
+def profiling(name: str):
+    """Makes a new profile current for the block (and the decodes it starts)."""
+    profile = CallTreeProfile(name)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+@contextmanager
+def profile_phase(root: str):
+    """Captures the call tree of the block when a profile is active, else does nothing."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    with profile.capture(root):
+        yield
+
+
+@contextmanager
+def profile_span(name: str):
+    """Records the wall time of an awaited block (e.g. the upstream fetch) as a single frame."""
+    profile = _current_profile.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.add((profile.name, name), time.perf_counter() - started)
+
+
+def should_sample() -> bool:
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def is_profiling_admin(request: Request) -> bool:
+    """True when profiling is enabled and the request carries the admin token."""
+    if not PROFILE_ADMIN_TOKEN:
+        return False
+    token = request.headers.get("x-admin-token", "")
+    return hmac.compare_digest(token.encode('utf-8'), PROFILE_ADMIN_TOKEN.encode('utf-8'))
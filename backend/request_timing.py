@@ -0,0 +1,78 @@
+"""
+Per-request phase timings, reported in the Server-Timing response header.
+
+The middleware in main.py starts a RequestTimings for every request; code
+on the request path records into it through the module functions, which
+do nothing outside a request (e.g. in the background snapshot task). The
+decode pool copies the context, so decodes record into the request that
+started them.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Order of the phases in the header
+PHASES = ("upstream", "decode", "serialize")
+
+_current_timings: contextvars.ContextVar[Optional['RequestTimings']] = contextvars.ContextVar(
+    "request_timings", default=None)
+
+
+class RequestTimings:
+    """Accumulated time per phase and manifest lookup counters for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def add_lookups(self, count: int, seconds: float) -> None:
+        with self._lock:
+            self.lookups += count
+            self.lookup_seconds += seconds
+
+    def header(self) -> str:
+        """Server-Timing value, e.g. 'upstream;dur=52.1, manifest;desc="31 lookups";dur=3.2, ...'."""
+        with self._lock:
+            entries = [f"{phase};dur={self.phases[phase] * 1000:.1f}" for phase in PHASES if phase in self.phases]
+            if self.lookups:
+                entries.insert(1 if "upstream" in self.phases else 0,
+                               f'manifest;desc="{self.lookups} lookups";dur={self.lookup_seconds * 1000:.1f}')
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def start_request_timings() -> RequestTimings:
+    """Makes a new RequestTimings current for this request."""
+    timings = RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def timed(phase: str):
+    """Adds the duration of the block to a phase of the current request."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def record_lookups(count: int, seconds: float = 0.0) -> None:
+    """Counts manifest lookups (and the time spent on cache misses) for the current request."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add_lookups(count, seconds)
@@ -0,0 +1,54 @@
+"""
+Routes for bungie.net images served from the local asset cache
+"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from backend.asset_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    THUMBNAIL_WIDTHS,
+    AssetNotFoundError,
+    AssetUpstreamError,
+    asset_cache,
+    normalize_asset_path,
+)
+from backend.http_cache import etag_matches
+
+router = APIRouter(prefix="/assets", tags=["assets"])
+
+
+@router.get("/{path:path}")
+async def get_asset(request: Request, path: str, w: Optional[int] = None):
+    """
+    Get a bungie.net image (icon, screenshot) through the local cache
+
+    path is the bungie.net path returned by the API, e.g.
+    /assets/common/destiny2_content/icons/<hash>.jpg. The image is fetched
+    from Bungie once, then served from disk with immutable cache headers.
+    ?w= (48, 96 or 192) returns a thumbnail at most that wide when the
+    server can resize images, else the original.
+
+    Returns:
+        Response: The image bytes
+
+    Raises:
+        HTTPException: 400 for a path or width that is not allowed, 404 if
+        Bungie has no such asset, 502 if Bungie is unavailable
+    """
+    try:
+        path = normalize_asset_path(path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if w is not None and w not in THUMBNAIL_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"Width must be one of {', '.join(map(str, THUMBNAIL_WIDTHS))}")
+
+    try:
+        asset, cache_status = await asset_cache.get(path, w)
+    except AssetNotFoundError:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    except AssetUpstreamError as e:
+        raise HTTPException(status_code=502, detail=f"Upstream asset error: {e}")
+
+    headers = {"ETag": asset.etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, "X-Cache": cache_status}
+    if etag_matches(request, asset.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=asset.content, media_type=asset.content_type, headers=headers)
@@ -2,6 +2,8 @@
 Routes for general API information
 """
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from backend.manifest_decoder import manifest_decoder
 
 router = APIRouter(tags=["general"])
 
@@ -20,11 +22,20 @@ def read_root():
         "version": "1.0.0",
         "endpoints": {
             "/health": "API health check",
+            "/health/live": "Liveness probe (the process answers)",
+            "/health/ready": "Readiness probe (a valid manifest is loaded)",
             "/xur": "Xûr inventory",
+            "/xur/stream": "Xûr change notifications (WebSocket)",
             "/xur/debug": "Xûr data debug",
+            "/items": "Decoded details of several items (hashes, GET or POST)",
+            "/assets/{path}": "Cached bungie.net images (?w= for thumbnails)",
+            "/items/search": "Full-text item search (q, rarity, class, item_type, page)",
             "/manifest/status": "Manifest status",
-            "/manifest/update": "Update manifest",
-            "/manifest/info": "Detailed manifest information"
+            "/manifest/update": "Update manifest (runs in background)",
+            "/manifest/rollback": "Switch back to the previous manifest version",
+            "/manifest/diff": "Definitions changed by the last manifest update",
+            "/manifest/info": "Detailed manifest information",
+            "/metrics": "Prometheus metrics"
         }
     }
 
@@ -43,3 +54,34 @@ def health_check():
         "version": "1.0.0",
         "service": "Destiny 2 Vendor Checker API"
     }
+
+
+@router.get("/health/live")
+def liveness_check():
+    """
+    Liveness probe: answers as soon as the process serves requests
+
+    Returns:
+        dict: Liveness status
+    """
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+def readiness_check():
+    """
+    Readiness probe: a valid manifest is loaded and items can be decoded
+
+    Returns:
+        dict: Readiness status and the manifest version in use
+
+    Raises:
+        503 response with the same body while no manifest is loaded
+    """
+    ready = manifest_decoder.is_ready()
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "manifest_loaded": ready,
+        "manifest_version": manifest_decoder.manifest_version or None
+    }
+    return JSONResponse(content=body, status_code=200 if ready else 503)
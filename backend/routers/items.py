@@ -0,0 +1,155 @@
+"""
+Routes for Destiny 2 item definitions
+"""
+import asyncio
+from typing import Iterable, List, Optional, Union
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from backend.decode_pool import DecodePoolFullError, decode_pool
+from backend.http_cache import cached_json_response
+from backend.items_service import (
+    IMMUTABLE_CACHE_CONTROL,
+    UNVERSIONED_CACHE_CONTROL,
+    items_response_cache,
+    parse_item_hashes,
+)
+from backend.locales import negotiate_locale
+from backend.manifest_decoder import manifest_decoders
+from backend.manifest_manager import served_locale
+
+router = APIRouter(prefix="/items", tags=["items"])
+
+
+class ItemsRequest(BaseModel):
+    hashes: List[Union[int, str]]
+    lang: Optional[str] = None
+    v: Optional[str] = None
+
+
+async def _items_response(request: Request, hashes: Iterable, lang: Optional[str], version: Optional[str]):
+    try:
+        item_hashes = parse_item_hashes(hashes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    requested_locale = negotiate_locale(lang, request.headers.get("accept-language"))
+    locale = await served_locale(lang, request.headers.get("accept-language"))
+    try:
+        version_tag, body, cache_status = await items_response_cache.get(await manifest_decoders.get_async(locale), item_hashes)
+    except DecodePoolFullError:
+        raise HTTPException(status_code=503, detail="Too many decodes in progress")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Item decoding timed out")
+
+    return cached_json_response(
+        request,
+        body,
+        # Only a URL naming the served manifest version may be cached forever, and not
+        # while another locale stands in for the requested one (e.g. during its install)
+        cache_control=(IMMUTABLE_CACHE_CONTROL if version == version_tag and locale == requested_locale
+                       else UNVERSIONED_CACHE_CONTROL),
+        headers={
+            "X-Cache": cache_status,
+            "X-Manifest-Version": version_tag,
+            "Content-Language": locale,
+            "Vary": "Accept-Encoding, Accept-Language"
+        }
+    )
+
+
+@router.get("")
+async def get_items(
+    request: Request,
+    hashes: str = Query(..., min_length=1),
+    lang: Optional[str] = None,
+    v: Optional[str] = None
+):
+    """
+    Get decoded details of several items in one request
+
+    hashes is a comma-separated list of item hashes (at most 100). Each
+    hash maps to the same details as the items embedded in /xur/ (without
+    instance stats), or null when unknown. Texts come from the manifest of
+    the locale given by ?lang= or Accept-Language.
+
+    The body carries manifestVersion (also in X-Manifest-Version). When
+    ?v= equals it, the response is marked immutable so clients and CDNs
+    keep it; without it, or when the requested locale is served in English
+    meanwhile (see Content-Language), it is cached for a few minutes.
+
+    Returns:
+        dict: manifestVersion, lang and items (hash -> details or null)
+
+    Raises:
+        HTTPException: 400 for invalid or too many hashes, 503/504 when decoding is overloaded
+    """
+    return await _items_response(request, [hashes], lang, v)
+
+
+@router.post("")
+async def post_items(request: Request, payload: ItemsRequest):
+    """
+    Get decoded details of several items, with the hashes in the request body
+
+    Same as GET /items for clients whose hash list does not fit in a URL:
+    the body is {"hashes": [...], "lang": optional, "v": optional}.
+
+    Returns:
+        dict: manifestVersion, lang and items (hash -> details or null)
+
+    Raises:
+        HTTPException: 400 for invalid or too many hashes, 503/504 when decoding is overloaded
+    """
+    return await _items_response(request, payload.hashes, payload.lang, payload.v)
+
+
+@router.get("/search")
+async def search_items(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=100),
+    rarity: Optional[str] = None,
+    class_name: Optional[str] = Query(None, alias="class"),
+    item_type: Optional[str] = None,
+    page: int = Query(1, ge=1, le=500),
+    page_size: int = Query(20, ge=1, le=50),
+    lang: Optional[str] = None
+):
+    """
+    Search items by name, description or flavour text
+
+    Every word of q must match the start of a word of the item. Results are
+    ranked by relevance (name matches first) and can be filtered by rarity
+    (e.g. Exotic), class (Titan, Hunter, Warlock) and item_type (e.g.
+    weapon, armor, or a DestinyItemType value). Texts come from the
+    manifest of the locale given by ?lang= or Accept-Language.
+
+    Returns:
+        dict: query, page, pageSize, total and the results (hash, name, icon,
+        itemTypeDisplayName, itemType, classType, rarity)
+
+    Raises:
+        HTTPException: 400 for an unknown filter value, 503 if the manifest has no search index
+            or decoding is overloaded, 504 if the search timed out
+    """
+    locale = await served_locale(lang, request.headers.get("accept-language"))
+    decoder = await manifest_decoders.get_async(locale)
+    try:
+        results = await decode_pool.run(decoder.search_items, q, rarity, class_name, item_type, page, page_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DecodePoolFullError:
+        raise HTTPException(status_code=503, detail="Too many decodes in progress")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Item search timed out")
+    if results is None:
+        raise HTTPException(status_code=503, detail="Item search is not available for the current manifest")
+
+    return JSONResponse(
+        results,
+        headers={
+            "Cache-Control": "public, max-age=300",
+            "Content-Language": locale,
+            "Vary": "Accept-Language"
+        }
+    )
@@ -1,17 +1,47 @@
 """
 Routes for Destiny 2 manifest management
 """
+import asyncio
 import os
-import json
 import logging
 import time
-from pathlib import Path
-from fastapi import APIRouter, HTTPException
-from backend.manifest_manager import update_manifest_if_needed
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from backend.manifest_manager import (
+    update_manifest_if_needed,
+    rollback_manifest,
+    clear_blocked_version,
+    read_manifest_info,
+    current_manifest_db_file,
+    current_manifest_diff,
+    manifest_leader,
+)
+from backend.manifest_leader import ManifestBusyError
+from backend.manifest_decoder import manifest_decoder, manifest_decoders
+from backend.admin import is_manifest_admin
+from backend.decode_pool import decode_pool
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/manifest", tags=["manifest"])
 
+# Background update started by POST /manifest/update
+update_task = None
+
+
+async def _run_update():
+    try:
+        logger.info("Forced manifest update requested...")
+        await update_manifest_if_needed()
+        logger.info("Forced update completed")
+    except Exception as e:
+        logger.error("Error during forced update: %s", e)
+
+
+def _require_manifest_admin(request: Request) -> None:
+    """Manifest changes need MANIFEST_ADMIN_TOKEN in X-Admin-Token."""
+    if not is_manifest_admin(request):
+        raise HTTPException(status_code=403, detail="Manifest administration is not allowed")
+
 
 @router.get("/status")
 async def get_manifest_status():
@@ -21,59 +51,151 @@ async def get_manifest_status():
     Returns:
         dict: Information about manifest status (existence, size, version, etc.)
     """
-    manifest_dir = Path(__file__).parent.parent / "manifest"
-    manifest_db_file = manifest_dir / "manifest.sqlite"
-    manifest_info_file = manifest_dir / "manifest_info.json"
+    manifest_db_file = current_manifest_db_file()
     
     status = {
         "manifest_exists": manifest_db_file.exists(),
         "manifest_size": os.path.getsize(manifest_db_file) if manifest_db_file.exists() else 0,
         "last_update": None,
         "version_path": None,
+        "blocked_version": None,
         "status": "unknown"
     }
     
-    if manifest_info_file.exists():
-        try:
-            with open(manifest_info_file, 'r', encoding='utf-8') as f:
-                info = json.load(f)
-                status.update(info)
-        except Exception as e:
-            logger.error("Error reading info file: %s", e)
+    try:
+        status.update(read_manifest_info())
+    except Exception as e:
+        logger.error("Error reading info file: %s", e)
     
     if manifest_db_file.exists():
         status["last_update"] = os.path.getmtime(manifest_db_file)
         status["status"] = "available"
     else:
         status["status"] = "missing"
+
+    status["definition_cache"] = manifest_decoder.cache_stats()
+    status["loaded_locales"] = manifest_decoders.stats()
+    status["decode_pool"] = decode_pool.stats()
+    status["update_in_progress"] = update_task is not None and not update_task.done()
+    status["worker"] = {"pid": os.getpid(), "leader": manifest_leader.is_leader}
     
     return status
 
 
-@router.post("/update")
-async def force_manifest_update():
+@router.post("/update", status_code=202)
+async def force_manifest_update(request: Request):
     """
     Force manifest update
     
+    The update runs in the background: the new version is installed and
+    validated next to the current one, which keeps serving requests until
+    the switch. Needs MANIFEST_ADMIN_TOKEN in X-Admin-Token.
+    
     Returns:
-        dict: Update result
+        dict: Update status
+    
+    Raises:
+        HTTPException: 403 without the admin token
     """
-    try:
-        logger.info("Forced manifest update requested...")
-        await update_manifest_if_needed()
-        logger.info("Forced update completed")
+    _require_manifest_admin(request)
+    global update_task
+    if update_task is not None and not update_task.done():
         return {
-            "status": "success", 
-            "message": "Manifest updated successfully",
+            "status": "in_progress",
+            "message": "A manifest update is already running",
             "timestamp": time.time()
         }
-    except Exception as e:
-        logger.error("Error during forced update: %s", e)
+
+    update_task = asyncio.create_task(_run_update())
+    return {
+        "status": "started", 
+        "message": "Manifest update started, see /manifest/status",
+        "timestamp": time.time()
+    }
+
+
+@router.post("/rollback")
+async def rollback_manifest_version(request: Request):
+    """
+    Switch back to the previously installed manifest version
+    
+    Needs MANIFEST_ADMIN_TOKEN in X-Admin-Token.
+    
+    Returns:
+        dict: The manifest information now in use
+    
+    Raises:
+        HTTPException: 403 without the admin token, 404 if no previous
+            version is available, 409 if another worker is installing a manifest
+    """
+    _require_manifest_admin(request)
+    try:
+        return await rollback_manifest()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ManifestBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.delete("/blocked")
+async def unblock_manifest_version(request: Request):
+    """
+    Allow the version blocked by the last rollback to be installed again
+
+    A rolled back version is skipped by update checks (startup, weekly and
+    POST /manifest/update) until it is unblocked. Needs MANIFEST_ADMIN_TOKEN
+    in X-Admin-Token.
+
+    Returns:
+        dict: The version that was blocked (null if none)
+
+    Raises:
+        HTTPException: 403 without the admin token,
+            409 if another worker is installing a manifest
+    """
+    _require_manifest_admin(request)
+    try:
+        return {"unblocked_version": await clear_blocked_version()}
+    except ManifestBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/diff")
+async def get_manifest_diff(table: Optional[str] = None, summary_only: bool = False):
+    """
+    Get the differences between the current manifest and the previous one
+    
+    Args:
+        table: Only return the changes of this table
+        summary_only: Only return the number of added/changed/removed rows per table
+    
+    Returns:
+        dict: Definition hashes added, changed and removed per table
+    
+    Raises:
+        HTTPException: 404 if no diff was recorded for the current version
+    """
+    diff = current_manifest_diff()
+    if diff is None:
         raise HTTPException(
-            status_code=500, 
-            detail=f"Error updating manifest: {str(e)}"
+            status_code=404,
+            detail="No diff recorded for the current manifest version."
         )
 
+    tables = diff['tables']
+    if table is not None:
+        tables = {table: tables.get(table, {'added': [], 'changed': [], 'removed': []})}
+    if summary_only:
+        tables = None
+
+    return {
+        'old_version': diff['old_version'],
+        'new_version': diff['new_version'],
+        'created_at': diff['created_at'],
+        'summary': diff['summary'],
+        'tables': tables
+    }
+
 
 @router.get("/info")
 async def get_manifest_info():
@@ -83,9 +205,7 @@ async def get_manifest_info():
     Returns:
         dict: Detailed manifest information
     """
-    manifest_dir = Path(__file__).parent.parent / "manifest"
-    manifest_db_file = manifest_dir / "manifest.sqlite"
-    manifest_info_file = manifest_dir / "manifest_info.json"
+    manifest_db_file = current_manifest_db_file()
     
     if not manifest_db_file.exists():
         raise HTTPException(
@@ -100,12 +220,9 @@ async def get_manifest_info():
         "is_readable": os.access(manifest_db_file, os.R_OK)
     }
     
-    if manifest_info_file.exists():
-        try:
-            with open(manifest_info_file, 'r', encoding='utf-8') as f:
-                stored_info = json.load(f)
-                info.update(stored_info)
-        except Exception as e:
-            logger.error("Error reading metadata: %s", e)
+    try:
+        info.update(read_manifest_info())
+    except Exception as e:
+        logger.error("Error reading metadata: %s", e)
     
     return info
@@ -0,0 +1,71 @@
+"""
+Prometheus metrics endpoint
+"""
+import os
+import time
+from fastapi import APIRouter, Response
+from backend.asset_cache import asset_cache
+from backend.decode_pool import decode_pool
+from backend.items_service import items_response_cache
+from backend.manifest_decoder import manifest_decoder
+from backend.metrics import CONTENT_TYPE, registry
+from backend.xur_service import xur_broadcaster, xur_response_cache
+
+router = APIRouter(tags=["metrics"])
+
+
+def _cache_counters():
+    definition_stats = manifest_decoder.cache_stats()
+    return {
+        'definitions': (definition_stats['hits'], definition_stats['misses']),
+        'item_details': (definition_stats['item_details']['hits'], definition_stats['item_details']['misses']),
+        'xur_response': (xur_response_cache.hits, xur_response_cache.misses),
+        'items_response': (items_response_cache.hits, items_response_cache.misses),
+        'assets': (asset_cache.hits, asset_cache.misses)
+    }
+
+
+def _cache_requests():
+    values = {}
+    for cache, (hits, misses) in _cache_counters().items():
+        values[(cache, "hit")] = hits
+        values[(cache, "miss")] = misses
+    return values
+
+
+def _cache_hit_ratio():
+    return {
+        (cache,): hits / (hits + misses) if hits + misses else None
+        for cache, (hits, misses) in _cache_counters().items()
+    }
+
+
+def _manifest_age():
+    try:
+        return {(): time.time() - os.path.getmtime(manifest_decoder.db_path)}
+    except OSError:
+        return {}
+
+
+registry.counter("cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"),
+                 callback=_cache_requests)
+registry.gauge("cache_hit_ratio", "Cache hit ratio since start.", ("cache",), callback=_cache_hit_ratio)
+registry.gauge("manifest_info", "Manifest version currently served.", ("version",),
+               callback=lambda: {(manifest_decoder.manifest_version,): 1})
+registry.gauge("manifest_age_seconds", "Time since the served manifest was installed.", callback=_manifest_age)
+registry.gauge("xur_stream_subscribers", "Open /xur/stream connections.",
+               callback=lambda: {(): xur_broadcaster.subscriber_count})
+registry.gauge("decode_pool_jobs", "Decode jobs waiting for or holding a worker.", ("state",),
+               callback=lambda: {(state,): decode_pool.stats()[state] for state in ("queued", "active")})
+
+
+@router.get("/metrics")
+def read_metrics():
+    """
+    Metrics in the Prometheus text exposition format
+
+    Returns:
+        Response: Route latency, Bungie upstream calls, manifest lookups,
+        cache ratios, event loop lag and manifest version/age
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
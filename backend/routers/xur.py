@@ -2,129 +2,136 @@
 """
 Routes for Xûr (Agent of the Nine) data
 """
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from backend import bungie_api
+from backend.http_cache import cached_json_response
 from backend.manifest_decoder import manifest_decoder
+from backend.manifest_manager import served_locale
+from backend.profiling import is_profiling_admin
+from backend.xur_service import XUR_VENDOR_HASH, get_xur_response_cache, profile_xur_build, xur_broadcaster
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/xur", tags=["xur"])
 
 @router.get("/")
-async def get_xur_inventory():
+async def get_xur_inventory(request: Request, profile: bool = False, lang: Optional[str] = None):
     """
     Get Xûr's inventory with decoded exotic items
     
     Returns Xûr's location and currently available exotic items
     with detailed information including names, descriptions, stats and rarity.
     Always returns HTTP 200 with isAvailable flag indicating Xûr's availability.
+    The decoded inventory is served from the snapshot rebuilt in the
+    background; X-Cache and Age headers describe the snapshot state.
+    The body is pre-compressed and carries an ETag: a matching
+    If-None-Match gets an empty 304 reply.
+
+    Names and descriptions come from the manifest of the locale given by
+    ?lang= or Accept-Language (Content-Language tells which one was used);
+    a locale not installed yet is served in English while it installs.
+
+    With ?profile=1 and the admin token in X-Admin-Token, the inventory is
+    fetched and decoded again under the profiler and the call tree is
+    returned as folded stacks (also saved on disk).
     
     Returns:
         dict: Complete Xûr inventory with availability status
     
     Raises:
-        HTTPException: 502 if Bungie API is unavailable
-        HTTPException: 500 if error processing data
+        HTTPException: 502 if Bungie API is unavailable, 403 if profiling is not allowed
     """
-    # Xûr's vendor hash in Bungie API
-    XUR_VENDOR_HASH = "2190858386"
-
-    params = {"components": "Vendors,VendorSales,ItemSockets,ItemCommonData,ItemStats,ItemInstances,ItemPerks,ItemPlugStates"}
-    endpoint = "/Destiny2/Vendors/"
+    if profile:
+        return await _profile_xur_inventory(request)
 
-    vendor_data = await bungie_api.make_bungie_request(endpoint, params=params)
-    if vendor_data is None:
+    locale = await served_locale(lang, request.headers.get("accept-language"))
+    entry, cache_status = await get_xur_response_cache(locale).get()
+    if entry is None:
         raise HTTPException(status_code=502, detail="Upstream Bungie API error")
 
-    # Check if Xûr is available in current vendors
-    response = vendor_data.get('Response', {})
-    vendors = response.get('vendors', {}).get('data', {})
-    bungie_has_xur = XUR_VENDOR_HASH in vendors
+    return cached_json_response(
+        request,
+        entry.encoded,
+        cache_control=f"public, max-age={entry.max_age}",
+        headers={
+            "X-Cache": cache_status,
+            "Age": str(entry.age),
+            "Content-Language": locale,
+            "Vary": "Accept-Encoding, Accept-Language"
+        }
+    )
 
-    # Check if Xûr should be available based on schedule (Paris time)
-    from datetime import datetime, timezone, timedelta
-    
-    # Paris timezone (UTC+1 or UTC+2 depending on daylight saving)
-    # For simplicity, assuming UTC+2 (summer time)
-    paris_offset = timedelta(hours=2)
-    paris_tz = timezone(paris_offset)
-    now_paris = datetime.now(paris_tz)
-    current_day = now_paris.weekday()  # 0 = Monday, 1 = Tuesday, ..., 4 = Friday, 5 = Saturday, 6 = Sunday
-    current_hour = now_paris.hour
-    
-    # Xûr is available from Friday 18h to Tuesday 18h (Paris time)
-    # Friday = 4, Saturday = 5, Sunday = 6, Monday = 0, Tuesday = 1
-    is_xur_scheduled = False
-    if current_day == 4 and current_hour >= 18:  # Friday after 18h
-        is_xur_scheduled = True
-    elif current_day in [5, 6, 0]:  # Saturday, Sunday, Monday
-        is_xur_scheduled = True
-    elif current_day == 1 and current_hour < 18:  # Tuesday before 18h
-        is_xur_scheduled = True
-    
-    # Use schedule-based availability (more reliable than Bungie API vendor list)
-    is_xur_currently_available = is_xur_scheduled
 
-    # Always try to get Xûr data - Bungie API keeps the last inventory even when he's gone
-    try:
-        decoded_data = manifest_decoder.decode_vendor_data(vendor_data)
-        
-        # Try to get Xûr data from the decoded response
-        xur_vendor_data = decoded_data['Response']['vendors']['data'].get(XUR_VENDOR_HASH, {})
-        xur_sales_data = decoded_data['Response']['sales']['data'].get(XUR_VENDOR_HASH, {})
-        
-        # If we have vendor data but no sales data, Xûr is not available but we can show his info
-        if not xur_vendor_data:
-            # No Xûr data at all - create basic structure
-            xur_vendor_data = {
-                'vendorHash': int(XUR_VENDOR_HASH),
-                'nextRefreshDate': '',
-                'enabled': False,
-                'name': 'Xûr',
-                'description': 'Agent of the Nine'
-            }
-        
-        if not xur_sales_data:
-            # No sales data - create empty sales structure
-            xur_sales_data = {'saleItems': {}}
-
-        xur_response = {
-            'vendor': xur_vendor_data,
-            'sales': xur_sales_data,
-            'isAvailable': is_xur_currently_available,
-            'message': 'Xûr is currently available' if is_xur_currently_available else 'Xûr is not currently available (showing last inventory)'
-        }
+async def _profile_xur_inventory(request: Request) -> PlainTextResponse:
+    if not is_profiling_admin(request):
+        raise HTTPException(status_code=403, detail="Profiling is not allowed")
 
-        return {
-            'Response': xur_response,
-            'ErrorCode': decoded_data.get('ErrorCode', 0),
-            'ThrottleSeconds': decoded_data.get('ThrottleSeconds', 0)
-        }
+    body, call_tree = await profile_xur_build()
+    if body is None:
+        raise HTTPException(status_code=502, detail="Upstream Bungie API error")
 
-    except Exception as e:
-        logger.error("Error decoding Xûr data: %s", e)
-        
-        # Return error but still with valid structure
-        xur_response = {
-            'vendor': {
-                'vendorHash': int(XUR_VENDOR_HASH),
-                'nextRefreshDate': '',
-                'enabled': False,
-                'name': 'Xûr',
-                'description': 'Agent of the Nine'
-            },
-            'sales': {
-                'saleItems': {}
-            },
-            'isAvailable': False,
-            'message': f'Error fetching Xûr data: {str(e)}'
+    path = call_tree.save()
+    logger.info("Profiled /xur/ request written to %s", path)
+    return PlainTextResponse(
+        call_tree.folded(),
+        headers={
+            "Cache-Control": "no-store",
+            "X-Profile-File": path.name,
+            "X-Profile-Upstream-Ms": f"{call_tree.total_seconds('upstream_fetch') * 1000:.1f}",
+            "X-Profile-Decode-Ms": f"{call_tree.total_seconds('decode_vendor_data') * 1000:.1f}"
         }
+    )
 
-        return {
-            'Response': xur_response,
-            'ErrorCode': 1,
-            'ThrottleSeconds': 0
-        }
+
+@router.websocket("/stream")
+async def stream_xur_updates(websocket: WebSocket):
+    """
+    Push notifications of Xûr inventory and availability changes
+
+    The first message ({"type": "xur_state"}) carries the current snapshot
+    ETag; then a {"type": "xur_update"} message with the new ETag and the
+    item hashes added/removed is sent whenever the snapshot changes.
+    Clients refetch /xur/ when the ETag differs from theirs. A "ping" text
+    message is answered with "pong". Notifications are those of the locale
+    given by ?lang= (English by default), as served by /xur/.
+    """
+    await websocket.accept()
+    locale = await served_locale(websocket.query_params.get("lang"), websocket.headers.get("accept-language"))
+    queue = xur_broadcaster.subscribe(locale)
+    if queue is None:
+        await websocket.close(code=1013, reason="Too many subscribers")
+        return
+
+    async def forward_updates():
+        while True:
+            await websocket.send_json(await queue.get())
+
+    async def answer_pings():
+        while True:
+            if await websocket.receive_text() == "ping":
+                await websocket.send_text("pong")
+
+    tasks = []
+    try:
+        await websocket.send_json(get_xur_response_cache(locale).current_state())
+        # Whichever side fails first (client gone, send error) ends the connection
+        tasks = [asyncio.create_task(forward_updates()), asyncio.create_task(answer_pings())]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning("Xûr stream connection closed on error: %r", error)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        xur_broadcaster.unsubscribe(queue)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
 
 
 @router.get("/debug")
@@ -141,8 +148,6 @@ async def debug_xur_data():
     Raises:
         HTTPException: 502 if unable to retrieve data
     """
-    XUR_VENDOR_HASH = "2190858386"
-    
     params = {
         "components": "Vendors,VendorSales,VendorCategories,ItemSockets,ItemCommonData,ItemStats,ItemInstances,ItemPerks,ItemPlugStates"
     }
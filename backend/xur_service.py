@@ -0,0 +1,509 @@
+"""
+Xûr inventory service: schedule, decoding and response caching
+"""
+import asyncio
+import copy
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from backend import bungie_api
+from backend.decode_pool import decode_pool
+from backend.http_cache import EncodedBody
+from backend.locales import DEFAULT_LOCALE
+from backend.manifest_decoder import ManifestDecoder, manifest_decoder, manifest_decoders
+from backend.profiling import CallTreeProfile, profile_span, profiling, should_sample
+from backend.request_timing import timed
+
+logger = logging.getLogger(__name__)
+
+# Xûr's vendor hash in Bungie API
+XUR_VENDOR_HASH = "2190858386"
+
+VENDOR_ENDPOINT = "/Destiny2/Vendors/"
+VENDOR_COMPONENTS = "Vendors,VendorSales,ItemSockets,ItemCommonData,ItemStats,ItemInstances,ItemPerks,ItemPlugStates"
+
+# Paris timezone (UTC+1 or UTC+2 depending on daylight saving)
+# For simplicity, assuming UTC+2 (summer time)
+PARIS_TZ = timezone(timedelta(hours=2))
+
+# Xûr arrives Friday 18h and leaves Tuesday 18h (Paris time)
+XUR_ARRIVAL_DAY = 4
+XUR_DEPARTURE_DAY = 1
+XUR_HOUR = 18
+
+# Background snapshot rebuild intervals (seconds)
+SNAPSHOT_PRESENT_INTERVAL = 600
+SNAPSHOT_ABSENT_INTERVAL = 3600
+SNAPSHOT_BOUNDARY_GRACE = 60
+SNAPSHOT_RETRY_BASE = 15
+SNAPSHOT_RETRY_MAX = 600
+# How often the other workers look for a payload shared by the leader
+SNAPSHOT_FOLLOW_INTERVAL = 15
+
+# Vendor payload fetched by the leader worker, read by the others (shared volume)
+XUR_VENDOR_FILE = Path(__file__).parent / "manifest" / "xur_vendor.json"
+
+# Open /xur/stream connections accepted per worker
+XUR_STREAM_MAX_SUBSCRIBERS = int(os.getenv("XUR_STREAM_MAX_SUBSCRIBERS", "10000"))
+
+
+def is_xur_scheduled(now: Optional[datetime] = None) -> bool:
+    """Tells whether Xûr should be available based on schedule (Paris time)."""
+    now_paris = (now or datetime.now(PARIS_TZ)).astimezone(PARIS_TZ)
+    current_day = now_paris.weekday()  # 0 = Monday, 1 = Tuesday, ..., 4 = Friday, 5 = Saturday, 6 = Sunday
+    current_hour = now_paris.hour
+
+    # Friday = 4, Saturday = 5, Sunday = 6, Monday = 0, Tuesday = 1
+    if current_day == XUR_ARRIVAL_DAY and current_hour >= XUR_HOUR:  # Friday after 18h
+        return True
+    if current_day in [5, 6, 0]:  # Saturday, Sunday, Monday
+        return True
+    if current_day == XUR_DEPARTURE_DAY and current_hour < XUR_HOUR:  # Tuesday before 18h
+        return True
+    return False
+
+
+def next_schedule_boundary(now: Optional[datetime] = None) -> datetime:
+    """Returns the next Xûr arrival (Friday 18h) or departure (Tuesday 18h)."""
+    now_paris = (now or datetime.now(PARIS_TZ)).astimezone(PARIS_TZ)
+    candidates = []
+    for day in (XUR_ARRIVAL_DAY, XUR_DEPARTURE_DAY):
+        days_ahead = (day - now_paris.weekday()) % 7
+        boundary = (now_paris + timedelta(days=days_ahead)).replace(hour=XUR_HOUR, minute=0, second=0, microsecond=0)
+        if boundary <= now_paris:
+            boundary += timedelta(days=7)
+        candidates.append(boundary)
+    return min(candidates)
+
+
+def parse_bungie_date(value: str) -> Optional[datetime]:
+    """Parses a Bungie ISO 8601 date such as '2024-01-01T17:00:00Z'."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def _default_vendor_info() -> Dict[str, Any]:
+    return {
+        'vendorHash': int(XUR_VENDOR_HASH),
+        'nextRefreshDate': '',
+        'enabled': False,
+        'name': 'Xûr',
+        'description': 'Agent of the Nine'
+    }
+
+
+def _decode_vendor_data_pinned(decoder: ManifestDecoder, vendor_data: Dict[str, Any],
+                               shared: bool) -> Tuple[str, Dict[str, Any]]:
+    if shared:
+        # Decoding modifies the payload in place
+        vendor_data = copy.deepcopy(vendor_data)
+    with decoder.pinned_version() as state:
+        return state.version, decoder.decode_vendor_data(vendor_data, vendor_hashes={XUR_VENDOR_HASH})
+
+
+async def decode_xur_response(vendor_data: Dict[str, Any], decoder: ManifestDecoder = manifest_decoder,
+                              shared: bool = False) -> Tuple[Dict[str, Any], str]:
+    """
+    Decodes a /Destiny2/Vendors/ payload into the /xur/ response body, in the
+    decoder's locale. Returns (body, manifest version the decode was pinned to).
+    A shared payload, decoded for several locales, is copied first.
+    """
+    # Use schedule-based availability (more reliable than Bungie API vendor list)
+    is_xur_currently_available = is_xur_scheduled()
+
+    # Always try to get Xûr data - Bungie API keeps the last inventory even when he's gone
+    manifest_version, decoded_data = await decode_pool.run(_decode_vendor_data_pinned, decoder, vendor_data, shared)
+
+    # Try to get Xûr data from the decoded response
+    xur_vendor_data = decoded_data['Response']['vendors']['data'].get(XUR_VENDOR_HASH, {})
+    xur_sales_data = decoded_data['Response']['sales']['data'].get(XUR_VENDOR_HASH, {})
+
+    # If we have vendor data but no sales data, Xûr is not available but we can show his info
+    if not xur_vendor_data:
+        # No Xûr data at all - create basic structure
+        xur_vendor_data = _default_vendor_info()
+
+    if not xur_sales_data:
+        # No sales data - create empty sales structure
+        xur_sales_data = {'saleItems': {}}
+
+    xur_response = {
+        'vendor': xur_vendor_data,
+        'sales': xur_sales_data,
+        'isAvailable': is_xur_currently_available,
+        'message': 'Xûr is currently available' if is_xur_currently_available else 'Xûr is not currently available (showing last inventory)'
+    }
+
+    return {
+        'Response': xur_response,
+        'ErrorCode': decoded_data.get('ErrorCode', 0),
+        'ThrottleSeconds': decoded_data.get('ThrottleSeconds', 0)
+    }, manifest_version
+
+
+def error_xur_response(error: Exception) -> Dict[str, Any]:
+    """Builds the /xur/ body returned when decoding failed, still with a valid structure."""
+    xur_response = {
+        'vendor': _default_vendor_info(),
+        'sales': {
+            'saleItems': {}
+        },
+        'isAvailable': False,
+        'message': f'Error fetching Xûr data: {str(error)}'
+    }
+
+    return {
+        'Response': xur_response,
+        'ErrorCode': 1,
+        'ThrottleSeconds': 0
+    }
+
+
+async def fetch_vendor_data() -> Optional[Dict[str, Any]]:
+    """Fetches the raw vendor payload from Bungie. Returns None on upstream errors."""
+    params = {"components": VENDOR_COMPONENTS}
+    with timed("upstream"), profile_span("upstream_fetch"):
+        return await bungie_api.make_bungie_request(VENDOR_ENDPOINT, params=params)
+
+
+async def profile_xur_build() -> Tuple[Optional[Dict[str, Any]], CallTreeProfile]:
+    """
+    Fetches and decodes a fresh /xur/ body under the profiler, without
+    touching the snapshot. Returns (body or None on upstream error, profile).
+    """
+    with profiling("xur") as profile:
+        vendor_data = await fetch_vendor_data()
+        body = (await decode_xur_response(vendor_data))[0] if vendor_data is not None else None
+    return body, profile
+
+
+def response_expiry(body: Dict[str, Any], now: Optional[datetime] = None) -> datetime:
+    """The vendor's nextRefreshDate or the next schedule boundary, whichever comes first."""
+    now = now or datetime.now(timezone.utc)
+    expiry = next_schedule_boundary(now)
+    next_refresh = parse_bungie_date(body.get('Response', {}).get('vendor', {}).get('nextRefreshDate', ''))
+    if next_refresh is not None and now < next_refresh < expiry:
+        expiry = next_refresh
+    return expiry
+
+
+class CachedXurResponse:
+    """
+    A decoded /xur/ body with the time it was built and the time it expires.
+    The body is serialized once, with its ETag, when the snapshot is built.
+    manifest_version is the version the body was decoded with (the current
+    one when not given).
+    """
+
+    def __init__(self, body: Dict[str, Any], expires_at: datetime, locale: str = DEFAULT_LOCALE,
+                 manifest_version: Optional[str] = None):
+        self.body = body
+        with timed("serialize"):
+            self.encoded = EncodedBody(body)
+        self.expires_at = expires_at
+        self.built_at = time.time()
+        self.locale = locale
+        if manifest_version is None:
+            manifest_version = manifest_decoders.current_version(locale)
+        self.manifest_version = manifest_version
+
+    def is_fresh(self) -> bool:
+        """
+        Valid until expiry, and only for the manifest version it was decoded
+        with (a locale unloaded since then is decoded again).
+        """
+        return (datetime.now(timezone.utc) < self.expires_at
+                and self.manifest_version == manifest_decoders.current_version(self.locale))
+
+    @property
+    def age(self) -> int:
+        return int(time.time() - self.built_at)
+
+    @property
+    def max_age(self) -> int:
+        """
+        Freshness lifetime from the build time until the vendor refresh or
+        schedule boundary (caches subtract the Age header from it).
+        """
+        built_at = datetime.fromtimestamp(self.built_at, timezone.utc)
+        return max(0, int((self.expires_at - built_at).total_seconds()))
+
+
+def _sale_item_hashes(body: Dict[str, Any]) -> Dict[str, Any]:
+    sale_items = body.get('Response', {}).get('sales', {}).get('saleItems', {})
+    return {key: sale_item.get('itemHash') for key, sale_item in sale_items.items()}
+
+
+def xur_change_notification(previous: Optional[CachedXurResponse], entry: CachedXurResponse) -> Dict[str, Any]:
+    """Small message describing a new snapshot: its ETag, availability and the items added/removed."""
+    old_items = _sale_item_hashes(previous.body) if previous is not None else {}
+    new_items = _sale_item_hashes(entry.body)
+    return {
+        'type': 'xur_update',
+        'lang': entry.locale,
+        'etag': entry.encoded.etag,
+        'isAvailable': entry.body['Response'].get('isAvailable', False),
+        'builtAt': entry.built_at,
+        'added': [item_hash for key, item_hash in new_items.items() if old_items.get(key) != item_hash],
+        'removed': [item_hash for key, item_hash in old_items.items() if new_items.get(key) != item_hash]
+    }
+
+
+class XurBroadcaster:
+    """
+    Fans out change notifications to the /xur/stream subscribers.
+
+    Each subscriber owns a one-slot queue that only keeps the latest
+    notification, so an idle or slow connection holds at most one pending
+    message and publishing never waits on a client. Subscribers only get
+    the notifications of their locale.
+    """
+
+    def __init__(self, max_subscribers: int):
+        self.max_subscribers = max_subscribers
+        self._subscribers: Dict[asyncio.Queue, str] = {}
+        self.published = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, locale: str = DEFAULT_LOCALE) -> Optional[asyncio.Queue]:
+        """Returns the new subscriber's queue, or None when the limit is reached."""
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers[queue] = locale
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.pop(queue, None)
+
+    def publish(self, message: Dict[str, Any], locale: str = DEFAULT_LOCALE) -> None:
+        self.published += 1
+        for queue, subscriber_locale in list(self._subscribers.items()):
+            if subscriber_locale != locale:
+                continue
+            if queue.full():
+                queue.get_nowait()  # Replaced by the newer notification
+            queue.put_nowait(message)
+
+
+class XurResponseCache:
+    """
+    Holds the latest decoded Xûr response (snapshot).
+
+    The snapshot is rebuilt in the background by refresh(); request handlers
+    call get(), which only fetches upstream when no fresh snapshot exists.
+    Concurrent misses wait on a single upstream fetch and decode. Decoding
+    errors are returned but never stored. A snapshot whose body differs
+    from the previous one is announced to the stream subscribers.
+    There is one cache per locale, decoded with that locale's manifest.
+    """
+
+    def __init__(self, broadcaster: XurBroadcaster, locale: str = DEFAULT_LOCALE):
+        self.broadcaster = broadcaster
+        self.locale = locale
+        self._entry: Optional[CachedXurResponse] = None
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.last_refresh_error: Optional[str] = None
+
+    async def get(self) -> Tuple[Optional[CachedXurResponse], str]:
+        """
+        Returns (entry, cache status) where the status is HIT, MISS or STALE.
+
+        entry is None when Bungie is unavailable and nothing was cached.
+        A request that waited on another request's fetch counts as a hit.
+        A stale snapshot is served when the upstream fetch or the decode
+        fails; the error body is only returned when there is none.
+        """
+        entry = self._entry
+        if entry is not None and entry.is_fresh():
+            self.hits += 1
+            return entry, "HIT"
+
+        async with self._lock:
+            entry = self._entry
+            if entry is not None and entry.is_fresh():
+                self.hits += 1
+                return entry, "HIT"
+
+            self.misses += 1
+            fresh_entry = await self._build()
+            if fresh_entry is None:
+                return entry, "STALE"
+            if fresh_entry is not self._entry and entry is not None:
+                # Decoding failed: the error body was not stored
+                return entry, "STALE"
+            return fresh_entry, "MISS"
+
+    async def refresh(self, vendor_data: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Rebuilds the snapshot from Bungie, or from a vendor payload already
+        fetched (and shared with other locales). Returns False when the
+        rebuild failed.
+        """
+        async with self._lock:
+            entry = await self._build(vendor_data)
+            return entry is not None and entry is self._entry
+
+    async def _build(self, vendor_data: Optional[Dict[str, Any]] = None) -> Optional[CachedXurResponse]:
+        """
+        Fetches (unless given the payload) and decodes a new snapshot (the
+        caller holds the lock). A PROFILE_SAMPLE_RATE share of the builds is
+        profiled to disk.
+        """
+        if not should_sample():
+            return await self._fetch_and_decode(vendor_data)
+
+        with profiling("xur-snapshot") as profile:
+            entry = await self._fetch_and_decode(vendor_data)
+        logger.info("Profiled Xûr snapshot build written to %s", profile.save())
+        return entry
+
+    async def _fetch_and_decode(self, vendor_data: Optional[Dict[str, Any]] = None) -> Optional[CachedXurResponse]:
+        shared = vendor_data is not None
+        if not shared:
+            vendor_data = await fetch_vendor_data()
+        if vendor_data is None:
+            self.last_refresh_error = "Upstream Bungie API error"
+            return None
+
+        try:
+            decoder = await manifest_decoders.get_async(self.locale)
+            body, manifest_version = await decode_xur_response(vendor_data, decoder, shared)
+        except Exception as e:
+            logger.error("Error decoding Xûr data: %s", e)
+            self.last_refresh_error = str(e)
+            return CachedXurResponse(error_xur_response(e), datetime.now(timezone.utc), self.locale)
+
+        self.last_refresh_error = None
+        previous = self._entry
+        self._entry = CachedXurResponse(body, response_expiry(body), self.locale, manifest_version)
+        if previous is None or previous.encoded.etag != self._entry.encoded.etag:
+            self.broadcaster.publish(xur_change_notification(previous, self._entry), self.locale)
+        return self._entry
+
+    def current_state(self) -> Dict[str, Any]:
+        """First message sent to a stream subscriber, to compare with its cached ETag."""
+        entry = self._entry
+        return {
+            'type': 'xur_state',
+            'lang': self.locale,
+            'etag': entry.encoded.etag if entry else None,
+            'isAvailable': entry.body['Response'].get('isAvailable', False) if entry else is_xur_scheduled(),
+            'builtAt': entry.built_at if entry else None
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the age of the current snapshot."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'age': self._entry.age if self._entry else None,
+            'built_at': self._entry.built_at if self._entry else None,
+            'last_refresh_error': self.last_refresh_error,
+            'stream_subscribers': self.broadcaster.subscriber_count
+        }
+
+
+def next_snapshot_delay(now: Optional[datetime] = None) -> float:
+    """
+    Seconds until the snapshot should be rebuilt: shortly after the next
+    arrival/departure, and at least every SNAPSHOT_PRESENT_INTERVAL while
+    Xûr is present (SNAPSHOT_ABSENT_INTERVAL otherwise).
+    """
+    now = now or datetime.now(timezone.utc)
+    until_boundary = (next_schedule_boundary(now) - now).total_seconds() + SNAPSHOT_BOUNDARY_GRACE
+    interval = SNAPSHOT_PRESENT_INTERVAL if is_xur_scheduled(now) else SNAPSHOT_ABSENT_INTERVAL
+    return max(1.0, min(until_boundary, interval))
+
+
+def get_xur_response_cache(locale: str) -> XurResponseCache:
+    """The snapshot cache of a locale, created on first use."""
+    cache = xur_response_caches.get(locale)
+    if cache is None:
+        cache = xur_response_caches[locale] = XurResponseCache(xur_broadcaster, locale)
+    return cache
+
+
+def _write_shared_vendor_data(vendor_data: Dict[str, Any]) -> None:
+    tmp_path = XUR_VENDOR_FILE.with_name(f"{XUR_VENDOR_FILE.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(vendor_data), encoding='utf-8')
+    os.replace(tmp_path, XUR_VENDOR_FILE)
+
+
+def _read_shared_vendor_data() -> Optional[Tuple[float, Dict[str, Any]]]:
+    """(modification time, payload) of the shared vendor payload, None when there is none."""
+    try:
+        modified = XUR_VENDOR_FILE.stat().st_mtime
+        return modified, json.loads(XUR_VENDOR_FILE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+async def refresh_xur_snapshots() -> bool:
+    """
+    Fetches the vendor payload (leader worker only), shares it with the
+    other workers and rebuilds the snapshots from it. Returns whether the
+    default locale's rebuild succeeded (it drives the retry backoff).
+    """
+    vendor_data = await fetch_vendor_data()
+    if vendor_data is None:
+        xur_response_cache.last_refresh_error = "Upstream Bungie API error"
+        return False
+
+    try:
+        await asyncio.to_thread(_write_shared_vendor_data, vendor_data)
+    except OSError as e:
+        logger.warning("Could not share the Xûr vendor payload: %s", e)
+    return await _refresh_from(vendor_data)
+
+
+_followed_modified: Optional[float] = None
+
+
+async def follow_xur_snapshots() -> bool:
+    """
+    Rebuilds the snapshots from the payload shared by the leader worker
+    when it changed since the last call, without calling Bungie. Returns
+    whether a new payload was used.
+    """
+    global _followed_modified
+    shared = await asyncio.to_thread(_read_shared_vendor_data)
+    if shared is None or shared[0] == _followed_modified:
+        return False
+    _followed_modified = shared[0]
+    await _refresh_from(shared[1])
+    return True
+
+
+async def _refresh_from(vendor_data: Dict[str, Any]) -> bool:
+    """
+    Rebuilds the snapshot of the default locale and of the other locales
+    still loaded (an unloaded one is rebuilt on its next request), all from
+    one vendor payload.
+    """
+    refreshed = await xur_response_cache.refresh(vendor_data)
+    loaded = manifest_decoders.loaded()
+    for locale, cache in list(xur_response_caches.items()):
+        if locale != DEFAULT_LOCALE and locale in loaded and loaded[locale].is_ready():
+            if not await cache.refresh(vendor_data):
+                logger.warning("Xûr snapshot refresh failed for locale %s: %s", locale, cache.last_refresh_error)
+    return refreshed
+
+
+xur_broadcaster = XurBroadcaster(XUR_STREAM_MAX_SUBSCRIBERS)
+xur_response_cache = XurResponseCache(xur_broadcaster)
+xur_response_caches: Dict[str, XurResponseCache] = {DEFAULT_LOCALE: xur_response_cache}
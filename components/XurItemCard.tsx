@@ -4,6 +4,7 @@ import { Text, View } from "./Themed";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import { LinearGradient } from "expo-linear-gradient";
 import Colors from "@/constants/Colors";
+import { assetUrl } from "@/services/api";
 
 const { width: screenWidth } = Dimensions.get("window");
 
@@ -101,7 +102,7 @@ const getClassColor = (className: string) => {
 
 export default function XurItemCard({ item, onPress }: XurItemCardProps) {
   const rarityColor = getRarityColor(item.rarity);
-  const imageUri = `https://www.bungie.net${item.itemIcon}`;
+  const imageUri = assetUrl(item.itemIcon, 96);
   const isSpecialOffer =
     item.itemName.includes("Strange") || item.costs.length === 0;
 
@@ -11,6 +11,7 @@ import { Text, View } from "@/components/Themed";
 import { MaterialCommunityIcons, Ionicons } from "@expo/vector-icons";
 import { LinearGradient } from "expo-linear-gradient";
 import Colors from "@/constants/Colors";
+import { assetUrl } from "@/services/api";
 
 const { width: screenWidth } = Dimensions.get("window");
 
@@ -120,7 +121,7 @@ export default function XurItemModal({
   if (!item) return null;
 
   const rarityColor = getRarityColor(item.rarity);
-  const imageUri = `https://www.bungie.net${item.itemIcon}`;
+  const imageUri = assetUrl(item.itemIcon);
 
   return (
     <Modal
@@ -203,7 +204,7 @@ export default function XurItemModal({
                     {perk.icon && (
                       <View style={styles.perkIconContainer}>
                         <Image
-                          source={{ uri: `https://www.bungie.net${perk.icon}` }}
+                          source={{ uri: assetUrl(perk.icon, 96) }}
                           style={styles.perkIcon}
                         />
                       </View>
@@ -1,5 +1,9 @@
 import { useState, useEffect, useCallback } from 'react';
-import { apiService, XurData, ApiResponse } from '../services/api';
+import { apiService, XurData, ApiResponse, XurStreamMessage } from '../services/api';
+
+// Reconnection delays for the update stream (doubled after each failure)
+const STREAM_RETRY_BASE_MS = 2000;
+const STREAM_RETRY_MAX_MS = 60000;
 
 export interface UseXurResult {
   xurData: XurData | null;
@@ -143,6 +147,47 @@ export function useXur(): UseXurResult {
     refreshXurData();
   }, [refreshXurData]);
 
+  // Refetch only when the server announces a snapshot we don't have yet
+  useEffect(() => {
+    let socket: WebSocket | null = null;
+    let retryTimeout: ReturnType<typeof setTimeout> | null = null;
+    let retryDelay = STREAM_RETRY_BASE_MS;
+    let closed = false;
+
+    const connect = () => {
+      socket = new WebSocket(apiService.getXurStreamUrl());
+
+      socket.onopen = () => {
+        retryDelay = STREAM_RETRY_BASE_MS;
+      };
+
+      socket.onmessage = (event) => {
+        try {
+          const message: XurStreamMessage = JSON.parse(event.data);
+          if (message.etag && message.etag !== apiService.getCachedEtag('/xur')) {
+            refreshXurData();
+          }
+        } catch {
+          // Ignore non-JSON messages such as "pong"
+        }
+      };
+
+      socket.onclose = () => {
+        if (closed) return;
+        retryTimeout = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, STREAM_RETRY_MAX_MS);
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      if (retryTimeout) clearTimeout(retryTimeout);
+      socket?.close();
+    };
+  }, [refreshXurData]);
+
   // Update time every second for live countdown
   useEffect(() => {
     const interval = setInterval(() => {
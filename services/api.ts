@@ -25,6 +25,13 @@ const API_BASE_URL = getApiBaseUrl();
 
 console.log('🌐 API_BASE_URL:', API_BASE_URL);
 
+// Device language, used by the API to pick the manifest locale of item names
+const DEVICE_LOCALE = Intl.DateTimeFormat().resolvedOptions().locale || 'en';
+
+// bungie.net image served through the API's asset cache (width: thumbnail for lists)
+export const assetUrl = (path: string, width?: 48 | 96 | 192): string =>
+  `${API_BASE_URL}/assets${path}${width ? `?w=${width}` : ''}`;
+
 export interface ItemPerk {
   hash: number;
   name: string;
@@ -69,6 +76,37 @@ export interface XurData {
   message?: string;
 }
 
+export interface XurStreamMessage {
+  type: 'xur_state' | 'xur_update';
+  lang: string;
+  etag: string | null;
+  isAvailable: boolean;
+  builtAt: number | null;
+  added?: number[];
+  removed?: number[];
+}
+
+export interface ItemDetails {
+  hash: number;
+  displayProperties: { name: string; description: string; icon: string };
+  itemType: number;
+  itemSubType: number;
+  classType: number;
+  rarity: string;
+  supportedClasses: string[];
+  flavorText: string;
+  stats: { [statHash: string]: unknown };
+  perks: ItemPerk[];
+  damageType: unknown;
+  ammoType: number;
+}
+
+export interface ItemsResponse {
+  manifestVersion: string;
+  lang: string;
+  items: { [itemHash: string]: ItemDetails | null };
+}
+
 export interface ApiResponse<T> {
   Response: T;
   ErrorCode: number;
@@ -76,8 +114,14 @@ export interface ApiResponse<T> {
 }
 
 class ApiService {
+  // Last body and ETag per endpoint, revalidated with If-None-Match
+  private etagCache = new Map<string, { etag: string; data: unknown }>();
+  // Manifest version of the last /items response: versioned URLs are cached forever
+  private itemsManifestVersion: string | null = null;
+
   private async makeRequest<T>(endpoint: string, retryCount = 0): Promise<T> {
     const url = `${API_BASE_URL}${endpoint}`;
+    const cached = this.etagCache.get(endpoint);
     
     try {
       console.log(`🌐 Making request to: ${url}`);
@@ -90,6 +134,8 @@ class ApiService {
           'Accept': 'application/json',
           // Ajouter User-Agent pour éviter certains blocages
           'User-Agent': 'OrbitMarket/1.0',
+          'Accept-Language': DEVICE_LOCALE,
+          ...(cached ? { 'If-None-Match': cached.etag } : {}),
         },
         // Gestion des redirections
         redirect: 'follow',
@@ -100,11 +146,20 @@ class ApiService {
       console.log(`📡 Response status: ${response.status} ${response.statusText}`);
       console.log(`📡 Response URL: ${response.url}`);
 
+      // Nothing changed since the last response: reuse it
+      if (response.status === 304 && cached) {
+        return cached.data as T;
+      }
+
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status} - ${response.statusText}`);
       }
 
       const data = await response.json();
+      const etag = response.headers.get('ETag');
+      if (etag) {
+        this.etagCache.set(endpoint, { etag, data });
+      }
       return data;
     } catch (error) {
       console.error(`❌ API request failed for ${endpoint}:`, error);
@@ -128,10 +183,28 @@ class ApiService {
     }
   }
 
+  // ETag of the last /xur body, compared with the stream notifications
+  getCachedEtag(endpoint: string): string | null {
+    return this.etagCache.get(endpoint)?.etag ?? null;
+  }
+
+  getXurStreamUrl(): string {
+    return `${API_BASE_URL.replace(/^http/, 'ws')}/xur/stream?lang=${encodeURIComponent(DEVICE_LOCALE)}`;
+  }
+
   async getXurInventory(): Promise<ApiResponse<XurData>> {
     return this.makeRequest<ApiResponse<XurData>>('/xur');
   }
 
+  // Decoded details of several items in one request (at most 100 hashes)
+  async getItems(hashes: number[]): Promise<ItemsResponse> {
+    const sorted = [...new Set(hashes)].sort((a, b) => a - b);
+    const version = this.itemsManifestVersion ? `&v=${this.itemsManifestVersion}` : '';
+    const response = await this.makeRequest<ItemsResponse>(`/items?hashes=${sorted.join(',')}${version}`);
+    this.itemsManifestVersion = response.manifestVersion;
+    return response;
+  }
+
   async getXurDebugInfo(): Promise<any> {
     return this.makeRequest('/xur/debug');
   }
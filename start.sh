@@ -26,6 +26,13 @@ else
 fi
 echo -e "${GREEN}✅ Fichier .env mis à jour avec l'IP: ${LOCAL_IP}${NC}"
 
+# Jeton d'administration du manifest (en-tête X-Admin-Token), généré une seule fois
+if ! grep -q "^MANIFEST_ADMIN_TOKEN=" .env; then
+    echo -e "${YELLOW}🔐 Génération de MANIFEST_ADMIN_TOKEN dans .env...${NC}"
+    echo "MANIFEST_ADMIN_TOKEN=$(python3 -c 'import secrets; print(secrets.token_hex(32))')" >> .env
+fi
+MANIFEST_ADMIN_TOKEN=$(grep "^MANIFEST_ADMIN_TOKEN=" .env | tail -n 1 | cut -d= -f2-)
+
 echo -e "${BLUE}🚀 Démarrage de Orbit Market${NC}"
 
 # Fonction pour nettoyer les processus existants
@@ -132,11 +139,11 @@ test_xur_api() {
         
         # Si l'API Xûr ne fonctionne pas, proposer de forcer la mise à jour du manifest
         echo -e "${YELLOW}🔧 Tentative de mise à jour forcée du manifest...${NC}"
-        update_response=$(curl -s -X POST -w "HTTPSTATUS:%{http_code}" "${API_URL}/manifest/update")
+        update_response=$(curl -s -X POST -H "X-Admin-Token: ${MANIFEST_ADMIN_TOKEN}" -w "HTTPSTATUS:%{http_code}" "${API_URL}/manifest/update")
         update_http_code=$(echo $update_response | grep -o "HTTPSTATUS:[0-9]*" | cut -d: -f2)
         update_body=$(echo $update_response | sed 's/HTTPSTATUS:[0-9]*$//')
         
-        if [ "$update_http_code" = "200" ]; then
+        if [ "$update_http_code" = "200" ] || [ "$update_http_code" = "202" ]; then
             echo -e "${GREEN}✅ Mise à jour du manifest réussie !${NC}"
             echo "$update_body" | python3 -m json.tool 2>/dev/null || echo "$update_body"
             
@@ -206,11 +213,11 @@ case "${1:-help}" in
         echo -e "${BLUE}🔄 Mise à jour forcée du manifest...${NC}"
         if check_backend; then
             echo -e "${YELLOW}🔧 Demande de mise à jour du manifest...${NC}"
-            update_response=$(curl -s -X POST -w "HTTPSTATUS:%{http_code}" "${API_URL}/manifest/update")
+            update_response=$(curl -s -X POST -H "X-Admin-Token: ${MANIFEST_ADMIN_TOKEN}" -w "HTTPSTATUS:%{http_code}" "${API_URL}/manifest/update")
             update_http_code=$(echo $update_response | grep -o "HTTPSTATUS:[0-9]*" | cut -d: -f2)
             update_body=$(echo $update_response | sed 's/HTTPSTATUS:[0-9]*$//')
             
-            if [ "$update_http_code" = "200" ]; then
+            if [ "$update_http_code" = "200" ] || [ "$update_http_code" = "202" ]; then
                 echo -e "${GREEN}✅ Mise à jour réussie !${NC}"
                 echo "$update_body" | python3 -m json.tool 2>/dev/null || echo "$update_body"
             else
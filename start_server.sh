@@ -27,6 +27,13 @@ else
     echo "📦 Cloning repository..."
     git clone $REPO_URL .
 fi
+
+# Generate the manifest administration token (X-Admin-Token) once
+touch .env
+if ! grep -q "^MANIFEST_ADMIN_TOKEN=" .env; then
+    echo "🔐 Generating MANIFEST_ADMIN_TOKEN in .env..."
+    echo "MANIFEST_ADMIN_TOKEN=$(openssl rand -hex 32)" >> .env
+fi
 # Build and launch application with Docker
 echo "🐳 Building Docker image..."
 docker compose down --remove-orphans || true